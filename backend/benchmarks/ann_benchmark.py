@@ -0,0 +1,92 @@
+"""Recall/latency benchmark of ANN index types against the exact flat baseline.
+
+Usage:
+    python -m backend.benchmarks.ann_benchmark --company "Tech Mahindra"
+    python -m backend.benchmarks.ann_benchmark --synthetic 200000 --dim 384
+"""
+import argparse
+import time
+import faiss
+import numpy as np
+from backend.services.embeddings import INDEX_DIR, apply_search_params, load_vector_store
+from backend.services.rag_pipeline import create_faiss_index
+
+NPROBE_SWEEP = [1, 4, 8, 16, 32, 64]
+EF_SEARCH_SWEEP = [16, 32, 64, 128, 256]
+
+def load_vectors(company: str, index_dir: str = INDEX_DIR) -> np.ndarray:
+    index = load_vector_store(company, index_dir).index
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass
+    return index.reconstruct_n(0, index.ntotal)
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    # Clustered data is closer to real embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 500), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.normal(size=(n, dim)).astype(np.float32)
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+def _measure(index, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    latencies = []
+    hits = 0
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(ids[0]) & set(truth[i]))
+    latencies = np.array(latencies) * 1000
+    return {
+        "recall_at_k": round(hits / (len(queries) * k), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+def run(vectors: np.ndarray, num_queries: int = 200, k: int = 5, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)
+    queries = vectors[picks] + 0.05 * rng.normal(size=(len(picks), vectors.shape[1])).astype(np.float32)
+
+    flat = create_faiss_index(vectors, "flat")
+    flat.add(vectors)
+    _, truth = flat.search(queries, k)
+
+    configs = [("flat", {}, None)]
+    configs += [("ivf_flat", {"nprobe": n}, "nprobe") for n in NPROBE_SWEEP]
+    configs += [("ivf_pq", {"nprobe": n}, "nprobe") for n in NPROBE_SWEEP]
+    configs += [("hnsw", {"ef_search": ef}, "ef_search") for ef in EF_SEARCH_SWEEP]
+
+    built = {"flat": (flat, 0.0)}
+    rows = []
+    for index_type, params, _ in configs:
+        if index_type not in built:
+            start = time.perf_counter()
+            index = create_faiss_index(vectors, index_type)
+            index.add(vectors)
+            built[index_type] = (index, time.perf_counter() - start)
+        index, build_seconds = built[index_type]
+        apply_search_params(index, **params)
+        row = {"index_type": index_type, **params, "build_s": round(build_seconds, 2)}
+        row.update(_measure(index, queries, truth, k))
+        rows.append(row)
+        settings = " ".join(f"{key}={value}" for key, value in params.items())
+        print(f"{index_type:<9} {settings:<14} recall@{k}={row['recall_at_k']:<7} p50={row['p50_ms']}ms p95={row['p95_ms']}ms")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare IVF/PQ/HNSW recall and latency to a flat index")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--company", help="Benchmark the vectors of an existing company index")
+    source.add_argument("--synthetic", type=int, help="Benchmark N synthetic clustered vectors")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.company) if args.company else synthetic_vectors(args.synthetic, args.dim)
+    run(vectors, args.queries, args.k)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Embedding throughput benchmark for index builds.
+
+Usage:
+    python -m backend.benchmarks.embedding_benchmark data/scraped_content/Infosys_20250101_120000.json \
+        --batch-sizes 16,32,64,128 --workers 1,2,4
+"""
+import argparse
+import time
+from backend.services.parser import load_search_results
+from backend.services.rag_pipeline import chunk_documents
+from backend.services.embeddings import EMBEDDING_MODEL_NAME, close_encode_pools, encode_texts, get_embedder
+
+def _int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+def run(filepath: str, batch_sizes: list, workers_list: list, model_name: str = EMBEDDING_MODEL_NAME, repeat: int = 1) -> list:
+    texts = [doc.page_content for doc in chunk_documents("benchmark", load_search_results(filepath))]
+    get_embedder(model_name)
+    # The embedding cache is bypassed throughout, or every run after the first would time SQLite lookups
+    encode_texts(texts[:8], model_name=model_name, use_cache=False)  # warm-up
+
+    rows = []
+    for workers in workers_list:
+        for batch_size in batch_sizes:
+            if workers > 1:
+                # Pool start-up is a one-off cost, keep it out of the measurement
+                encode_texts(texts[:8], model_name=model_name, batch_size=batch_size, workers=workers, use_cache=False)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                encode_texts(texts, model_name=model_name, batch_size=batch_size, workers=workers, use_cache=False)
+            elapsed = (time.perf_counter() - start) / repeat
+            rows.append({
+                "workers": workers,
+                "batch_size": batch_size,
+                "chunks": len(texts),
+                "seconds": round(elapsed, 3),
+                "chunks_per_sec": round(len(texts) / elapsed, 1),
+            })
+            print(f"workers={workers:<3} batch={batch_size:<5} {rows[-1]['chunks_per_sec']:>9} chunks/sec")
+    close_encode_pools()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure chunks/sec for embedding batch sizes and worker counts")
+    parser.add_argument("filepath", help="Scraped search results file")
+    parser.add_argument("--batch-sizes", type=_int_list, default=[16, 32, 64, 128])
+    parser.add_argument("--workers", type=_int_list, default=[1, 2, 4])
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    run(args.filepath, args.batch_sizes, args.workers, args.model, args.repeat)
+
+if __name__ == "__main__":
+    main()
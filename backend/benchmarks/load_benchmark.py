@@ -0,0 +1,315 @@
+"""Offline load benchmark for the API: search providers, Gemini and the embedding model are local stand-ins.
+
+The API runs in-process under uvicorn with its provider URLs pointed at a mock
+server and its Gemini models replaced, then each endpoint is driven with
+concurrent requests. Results are written as JSON named after the current commit
+so runs can be compared across commits.
+
+Usage:
+    python -m backend.benchmarks.load_benchmark --scrapes data/scraped_content/Infosys_20250101_120000.json
+    python -m backend.benchmarks.load_benchmark --requests 40 --concurrency 8 \
+        --provider-profile default=150:0.5:0.02 --provider-profile tavily=400:0.8:0.1 --llm-profile 600:0.4:0.01
+    python -m backend.benchmarks.load_benchmark --compare data/benchmarks/20250101_120000_ab12cd3.json
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import requests
+from backend.benchmarks.stand_ins import (
+    PROVIDERS,
+    FakeGenerativeModel,
+    HashingEmbeddings,
+    LatencyProfile,
+    MockSearchServer,
+    parse_profile,
+    synthetic_scrape,
+)
+
+SCENARIOS = ("search-all", "build-rag", "ask", "generate-report")
+RESULTS_DIR = "data/benchmarks"
+REQUEST_TIMEOUT = 600
+
+def _scenario_list(value: str) -> list:
+    names = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown scenarios {sorted(unknown)}, expected some of {SCENARIOS}")
+    return names
+
+def _provider_profiles(values: list) -> tuple:
+    default, profiles = LatencyProfile(), {}
+    for value in values or []:
+        name, _, spec = value.partition("=")
+        if name == "default":
+            default = parse_profile(spec)
+        elif name in PROVIDERS:
+            profiles[name] = parse_profile(spec)
+        else:
+            raise ValueError(f"Unknown provider '{name}' in --provider-profile, expected 'default' or one of {PROVIDERS}")
+    return default, profiles
+
+def load_recorded_scrapes(paths: list) -> dict:
+    from backend.services.storage import read_scrape
+
+    merged = {}
+    for path in paths:
+        merged.update(read_scrape(path))
+    return merged
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain"], capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+def configure_environment(mock: MockSearchServer, warm_caches: bool, rate_limits: bool):
+    """Point the provider URLs at the mock server; must run before any backend.services import."""
+    for name in PROVIDERS:
+        os.environ[f"{name.upper()}_URL"] = mock.url(name)
+    for key in ("TAVILY_API_KEY", "SERPAPI_KEY", "BRAVE_API_KEY", "NEWSAPI_KEY", "RAPIDAPI_KEY", "GEMINI_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    if not warm_caches:
+        # Every request should reach the stand-ins, not a cache filled by an earlier request
+        for flag in ("SEARCH_CACHE_ENABLED", "EMBEDDING_CACHE_ENABLED", "ANSWER_CACHE_ENABLED"):
+            os.environ[flag] = "0"
+    # Real provider limits (e.g. 5 req/s, daily quotas) would throttle the stand-ins and hide the code being measured
+    os.environ["RATE_LIMIT_ENABLED"] = "1" if rate_limits else "0"
+
+def install_stand_ins(model: FakeGenerativeModel, real_embeddings: bool, embed_ms_per_text: float):
+    from backend.services import embeddings, query_generator, rag_qa, report_generator
+
+    for module in (query_generator, report_generator, rag_qa):
+        module.model = model
+    if not real_embeddings:
+        embeddings._embedders[embeddings.EMBEDDING_MODEL_NAME] = HashingEmbeddings(
+            embeddings.EMBEDDING_MODEL_NAME, seconds_per_text=embed_ms_per_text / 1000
+        )
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def serve_app():
+    """Run the FastAPI app under uvicorn in a background thread; returns (base_url, server, thread)."""
+    import uvicorn
+    from backend.main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True, name="benchmark-api")
+    thread.start()
+    deadline = time.time() + 60
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("API server did not start within 60s")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server, thread
+
+def summarize(latencies: list, errors: list, wall_seconds: float) -> dict:
+    completed = len(latencies)
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests": completed,
+        "errors": len(errors),
+        "error_sample": errors[:3],
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round((completed - len(errors)) / wall_seconds, 3) if wall_seconds else 0.0,
+        "mean_ms": round(float(ms.mean()), 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p95_ms": round(float(np.percentile(ms, 95)), 1),
+        "p99_ms": round(float(np.percentile(ms, 99)), 1),
+        "max_ms": round(float(ms.max()), 1),
+    }
+
+def run_scenario(send, payloads: list, concurrency: int) -> dict:
+    """Issue `send(session, payload)` for every payload with `concurrency` clients."""
+    local = threading.local()
+
+    def one(payload):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = send(local.session, payload)
+            body = response.json()
+            error = None if response.status_code == 200 and body.get("status") == "success" else str(body.get("error", response.status_code))
+        except Exception as e:
+            error = str(e)
+        return time.perf_counter() - start, error
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for elapsed, error in pool.map(one, payloads):
+            latencies.append(elapsed)
+            if error:
+                errors.append(error)
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+def _senders(base_url: str, company: str, scrape_path: str, questions: list, args) -> dict:
+    def search_all(session, i):
+        return session.post(f"{base_url}/search-all/", json={
+            "company": f"{company} {i}", "questions": questions, "strategy": args.strategy,
+        }, timeout=REQUEST_TIMEOUT)
+
+    def build_rag(session, i):
+        return session.post(f"{base_url}/build-rag/", json={
+            "company": f"{company} {i}", "filepath": scrape_path, "index_type": args.index_type,
+        }, timeout=REQUEST_TIMEOUT)
+
+    def ask(session, i):
+        return session.post(f"{base_url}/ask/", json={
+            "company": company, "question": questions[i % len(questions)],
+        }, timeout=REQUEST_TIMEOUT)
+
+    def generate_report(session, i):
+        return session.get(f"{base_url}/generate-report/", params={
+            "filepath": scrape_path, "mode": args.report_mode,
+        }, timeout=REQUEST_TIMEOUT)
+
+    return {"search-all": search_all, "build-rag": build_rag, "ask": ask, "generate-report": generate_report}
+
+def run(args) -> dict:
+    scrapes = [os.path.abspath(p) for p in args.scrapes]
+    output_dir = os.path.abspath(args.output_dir)
+    revision = git_revision()
+    workspace = tempfile.mkdtemp(prefix="load-benchmark-")
+    cwd = os.getcwd()
+
+    replay = load_recorded_scrapes(scrapes) if scrapes else synthetic_scrape(args.company, args.questions)
+    default, profiles = _provider_profiles(args.provider_profile)
+    mock = MockSearchServer(profiles, default, replay, seed=args.seed).start()
+    model = FakeGenerativeModel(parse_profile(args.llm_profile), args.llm_tokens_per_second, args.llm_output_tokens, seed=args.seed)
+    server = None
+    try:
+        # All relative data/ and embeddings/ paths used by the services land in the workspace
+        os.chdir(workspace)
+        configure_environment(mock, args.warm_caches, args.rate_limits)
+        install_stand_ins(model, args.real_embeddings, args.embed_ms_per_text)
+        from backend.services.storage import scrape_extension, write_scrape
+
+        os.makedirs("data/scraped_content", exist_ok=True)
+        scrape_path = os.path.abspath(os.path.join("data/scraped_content", f"replay{scrape_extension()}"))
+        write_scrape(scrape_path, replay)
+        questions = list(replay)
+
+        base_url, server, thread = serve_app()
+        senders = _senders(base_url, args.company, scrape_path, questions, args)
+        if "ask" in args.scenarios:
+            # /ask needs an index for the base company; its build is setup, not measurement
+            setup = run_scenario(lambda session, _: requests.post(f"{base_url}/build-rag/", json={
+                "company": args.company, "filepath": scrape_path, "index_type": args.index_type,
+            }, timeout=REQUEST_TIMEOUT), [0], 1)
+            if setup["errors"]:
+                raise RuntimeError(f"Index build for /ask failed: {setup['error_sample']}")
+
+        results = {}
+        for name in args.scenarios:
+            print(f"[INFO] {name}: {args.requests} requests, concurrency {args.concurrency}")
+            results[name] = run_scenario(senders[name], list(range(args.requests)), args.concurrency)
+            print(_format_row(name, results[name]))
+    finally:
+        if server is not None:
+            # Let the shutdown handlers finish before the workspace goes away
+            server.should_exit = True
+            thread.join(timeout=30)
+        mock.stop()
+        os.chdir(cwd)
+        if not args.keep_workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    report = {
+        **revision,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "scrapes": scrapes,
+            "questions": len(questions),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "strategy": args.strategy,
+            "index_type": args.index_type,
+            "report_mode": args.report_mode,
+            "warm_caches": args.warm_caches,
+            "rate_limits": args.rate_limits,
+            "real_embeddings": args.real_embeddings,
+            "provider_default": default.to_dict(),
+            "provider_profiles": {name: p.to_dict() for name, p in profiles.items()},
+            "llm_profile": model.profile.to_dict(),
+            "llm_tokens_per_second": args.llm_tokens_per_second,
+            "llm_output_tokens": args.llm_output_tokens,
+            "seed": args.seed,
+        },
+        "scenarios": results,
+        "stand_ins": {"providers": mock.stats(), "llm": model.stats()},
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(output_dir, f"{stamp}_{revision['commit']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[INFO] Results saved to {path}")
+    return report
+
+def _format_row(name: str, row: dict) -> str:
+    return (f"{name:<16} {row['throughput_rps']:>8.2f} req/s  p50 {row['p50_ms']:>9.1f} ms  "
+            f"p95 {row['p95_ms']:>9.1f} ms  p99 {row['p99_ms']:>9.1f} ms  errors {row['errors']}/{row['requests']}")
+
+def compare(baseline_path: str, current: dict):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"Compared with {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for name, row in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        deltas = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            change = (row[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            deltas.append(f"{key} {old[key]} -> {row[key]} ({change:+.1f}%)")
+        print(f"  {name:<16} " + ", ".join(deltas))
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline API load benchmark against local provider and Gemini stand-ins")
+    parser.add_argument("--scrapes", nargs="*", default=[], help="Recorded scrape files to replay (default: synthetic)")
+    parser.add_argument("--company", default="Benchmark Co")
+    parser.add_argument("--questions", type=int, default=15, help="Questions in the synthetic scrape")
+    parser.add_argument("--scenarios", type=_scenario_list, default=list(SCENARIOS), help=f"Comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--strategy", default=None, help="Search strategy for /search-all/")
+    parser.add_argument("--index-type", default=None)
+    parser.add_argument("--report-mode", default="single")
+    parser.add_argument("--provider-profile", action="append", metavar="NAME=MEDIAN_MS[:SIGMA[:FAILURE_RATE]]",
+                        help="Latency/failure profile for a provider, or 'default' for all; repeatable")
+    parser.add_argument("--llm-profile", default="400:0.4:0", metavar="MEDIAN_MS[:SIGMA[:FAILURE_RATE]]",
+                        help="Time to first token and failure rate of the fake Gemini model")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--llm-output-tokens", type=int, default=150)
+    parser.add_argument("--embed-ms-per-text", type=float, default=0.0, help="Simulated encode cost of the hashing embedder")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the configured sentence-transformers model")
+    parser.add_argument("--rate-limits", action="store_true", help="Apply the per-provider rate limits and daily quotas")
+    parser.add_argument("--warm-caches", action="store_true", help="Leave the search, embedding and answer caches enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", help="Earlier results file to diff against")
+    parser.add_argument("--keep-workspace", action="store_true")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.compare:
+        compare(args.compare, report)
+
+if __name__ == "__main__":
+    main()
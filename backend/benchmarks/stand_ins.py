@@ -0,0 +1,309 @@
+"""Local stand-ins for the search providers, Gemini and the embedding model.
+
+Used by the load benchmark so every API path can be exercised offline with
+controlled latency and failure rates.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+from google.api_core.exceptions import ServiceUnavailable
+from langchain.embeddings.base import Embeddings
+from backend.services.tokens import estimate_tokens
+
+PROVIDERS = ("tavily", "serpapi", "brave", "newsapi", "rapidapi", "wikipedia")
+
+WORDS = (
+    "revenue growth margin segment client digital cloud services consulting acquisition partnership "
+    "platform workforce headcount leadership board strategy market share europe americas asia "
+    "sustainability emissions patent research automation telecom banking healthcare retail "
+    "quarter fiscal guidance dividend subsidiary contract deal pipeline outlook regulation"
+).split()
+
+class LatencyProfile:
+    """Log-normal latency around `median_ms` plus an independent failure rate."""
+
+    def __init__(self, median_ms: float = 100.0, sigma: float = 0.5, failure_rate: float = 0.0):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        return rng.lognormvariate(np.log(self.median_ms / 1000), self.sigma)
+
+    def fails(self, rng: random.Random) -> bool:
+        return rng.random() < self.failure_rate
+
+    def to_dict(self) -> dict:
+        return {"median_ms": self.median_ms, "sigma": self.sigma, "failure_rate": self.failure_rate}
+
+def parse_profile(value: str) -> LatencyProfile:
+    """Parse "MEDIAN_MS[:SIGMA[:FAILURE_RATE]]", e.g. "250:0.6:0.05"."""
+    parts = [float(p) for p in value.split(":")]
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"Bad latency profile '{value}', expected MEDIAN_MS[:SIGMA[:FAILURE_RATE]]")
+    return LatencyProfile(*parts)
+
+def _rng_for(text: str) -> random.Random:
+    return random.Random(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16))
+
+def _sentences(rng: random.Random, count: int) -> str:
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        for _ in range(count)
+    )
+
+def synthetic_results(query: str, max_results: int = 5) -> list:
+    """Deterministic fake search results for `query`, in the normalized provider shape."""
+    rng = _rng_for(query)
+    slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")[:60]
+    return [
+        {
+            "url": f"https://example.com/{slug}/{i}",
+            "title": f"{query} - result {i}",
+            "content": _sentences(rng, rng.randint(6, 14)),
+        }
+        for i in range(1, max_results + 1)
+    ]
+
+def synthetic_scrape(company: str, num_questions: int = 15, results_per_question: int = 5) -> dict:
+    topics = ["revenue", "leadership", "competitors", "acquisitions", "ESG practices", "products", "headcount",
+              "funding", "global operations", "R&D", "supply chain", "partnerships", "legal issues", "mission", "patents"]
+    questions = [f"{i}. What are {company}'s {topics[(i - 1) % len(topics)]}?" for i in range(1, num_questions + 1)]
+    return {q: synthetic_results(q, results_per_question) for q in questions}
+
+def _provider_body(provider: str, results: list) -> dict:
+    if provider == "tavily":
+        return {"results": results}
+    if provider == "serpapi":
+        return {"organic_results": [{"link": r["url"], "title": r["title"], "snippet": r["content"]} for r in results]}
+    if provider == "brave":
+        return {"web": {"results": [{"url": r["url"], "title": r["title"], "description": r["content"]} for r in results]}}
+    if provider == "newsapi":
+        return {"articles": [{"url": r["url"], "title": r["title"], "description": r["content"]} for r in results]}
+    if provider == "rapidapi":
+        return {"webPages": {"value": [{"url": r["url"], "name": r["title"], "snippet": r["content"]} for r in results]}}
+    return {"query": {"search": [{"title": r["title"], "snippet": r["content"]} for r in results]}}
+
+def _query_and_limit(provider: str, params: dict) -> tuple:
+    if provider == "tavily":
+        return params.get("query", ""), int(params.get("max_results", 5))
+    if provider == "wikipedia":
+        return params.get("srsearch", ""), 10
+    limit_key = {"serpapi": "num", "newsapi": "pageSize"}.get(provider, "count")
+    return params.get("q", ""), int(params.get(limit_key, 5))
+
+class MockSearchServer:
+    """HTTP server answering in the response format of each search provider.
+
+    Queries found in `replay` ({question: [result, ...]}, e.g. a recorded scrape)
+    get their recorded results back; anything else gets synthetic results.
+    """
+
+    def __init__(self, profiles: dict = None, default: LatencyProfile = None, replay: dict = None, seed: int = 0):
+        self.default = default or LatencyProfile()
+        self.profiles = profiles or {}
+        self.replay = {self._key(q): [r for r in items if "url" in r] for q, items in (replay or {}).items()}
+        self.rng = random.Random(seed)
+        self.counts = {name: {"requests": 0, "failures": 0} for name in PROVIDERS}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @staticmethod
+    def _key(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def profile(self, provider: str) -> LatencyProfile:
+        return self.profiles.get(provider, self.default)
+
+    def url(self, provider: str) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{provider}"
+
+    def respond(self, provider: str, params: dict) -> tuple:
+        """Return (status, body) for one request after sleeping the sampled latency."""
+        profile = self.profile(provider)
+        with self._lock:
+            delay = profile.sample(self.rng)
+            failed = profile.fails(self.rng)
+            status = self.rng.choice((429, 503)) if failed else 200
+            self.counts[provider]["requests"] += 1
+            self.counts[provider]["failures"] += failed
+        time.sleep(delay)
+        if failed:
+            return status, {"error": "stand-in failure"}
+        query, limit = _query_and_limit(provider, params)
+        results = self.replay.get(self._key(query)) or synthetic_results(query, limit)
+        return 200, _provider_body(provider, results[:limit])
+
+    def start(self, host: str = "127.0.0.1", port: int = 0):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so the pooled provider sessions behave as they do against real APIs
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, params):
+                provider = urlparse(self.path).path.strip("/").split("/")[0]
+                if provider not in PROVIDERS:
+                    self.send_error(404)
+                    return
+                status, body = mock.respond(provider, params)
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._reply({k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self._reply(json.loads(self.rfile.read(length) or b"{}"))
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="mock-search")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: dict(counts) for name, counts in self.counts.items()}
+
+class FakeGenerativeModel:
+    """Stands in for google.generativeai.GenerativeModel.
+
+    Latency is the sampled time to first token plus `output_tokens / tokens_per_second`;
+    failures raise ServiceUnavailable like an overloaded Gemini endpoint.
+    """
+
+    def __init__(self, profile: LatencyProfile = None, tokens_per_second: float = 200.0, output_tokens: int = 150, seed: int = 0,
+                 model_name: str = "models/fake-gemini"):
+        # Read by callers such as the report section cache key
+        self.model_name = model_name
+        self.profile = profile or LatencyProfile(median_ms=400)
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def _plan(self) -> tuple:
+        with self._lock:
+            self.calls += 1
+            failed = self.profile.fails(self.rng)
+            self.failures += failed
+            return self.profile.sample(self.rng), failed
+
+    def _text(self, prompt: str) -> str:
+        rng = _rng_for(prompt)
+        if "numbered bullet list" in prompt:
+            company = re.search(r"input '([^']*)'", prompt)
+            scrape = synthetic_scrape(company.group(1) if company else "the company")
+            return "\n".join(scrape)
+        words = re.findall(r"[A-Za-z]{4,}", prompt) or WORDS
+        count = max(1, int(self.output_tokens * 0.75))
+        return " ".join(rng.choice(words) for _ in range(count)) + "."
+
+    def _response(self, prompt: str, text: str):
+        usage = SimpleNamespace(prompt_token_count=estimate_tokens(prompt), candidates_token_count=estimate_tokens(text))
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def _generation_seconds(self, text: str) -> float:
+        return estimate_tokens(text) / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        first_token, failed = self._plan()
+        time.sleep(first_token)
+        if failed:
+            raise ServiceUnavailable("stand-in model overloaded")
+        text = self._text(prompt)
+        time.sleep(self._generation_seconds(text))
+        return self._response(prompt, text)
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        first_token, failed = self._plan()
+        await asyncio.sleep(first_token)
+        if failed:
+            raise ServiceUnavailable("stand-in model overloaded")
+        text = self._text(prompt)
+        if not stream:
+            await asyncio.sleep(self._generation_seconds(text))
+            return self._response(prompt, text)
+
+        words = text.split(" ")
+        pieces = [" ".join(words[i:i + 8]) + " " for i in range(0, len(words), 8)]
+        delay = self._generation_seconds(text) / max(len(pieces), 1)
+
+        async def chunks():
+            for i, piece in enumerate(pieces):
+                if i:
+                    await asyncio.sleep(delay)
+                yield SimpleNamespace(text=piece)
+        return chunks()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "failures": self.failures}
+
+class HashingEncoder:
+    """SentenceTransformer-shaped encoder using feature hashing: no model download, stable vectors."""
+
+    def __init__(self, dim: int = 384, seconds_per_text: float = 0.0):
+        self.dim = dim
+        self.seconds_per_text = seconds_per_text
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, normalize_embeddings: bool = False, **kwargs):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(texts))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+class HashingEmbeddings(Embeddings):
+    """Drop-in for CachedHuggingFaceEmbeddings backed by HashingEncoder."""
+
+    def __init__(self, model_name: str, dim: int = 384, seconds_per_text: float = 0.0):
+        self.model_name = model_name
+        self.client = HashingEncoder(dim, seconds_per_text)
+        self.encode_kwargs = {"normalize_embeddings": True}
+
+    def embed_documents(self, texts):
+        # Imported late: the embeddings module reads its cache settings at import time
+        from backend.services.embeddings import encode_texts
+        return encode_texts(list(texts), model_name=self.model_name, workers=1).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
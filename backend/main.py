@@ -1,15 +1,30 @@
-from fastapi import FastAPI, Query, Body
+import json
+import time
+import uuid
+from fastapi import FastAPI, Query, Body, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 from backend.services.query_generator import generate_query_list
 from backend.services.search_engine import search_web
+from backend.services.search_cache import search_cache
+from backend.services.provider_health import provider_health
+from backend.services.rate_limiter import rate_limiter
+from backend.services.http_client import close_sessions
 from backend.services.bulk_search import bulk_search_questions
 from backend.services.parser import load_search_results
 from backend.services.rag_pipeline import build_faiss_index
-from backend.services.report_generator import create_report_from_json
-from backend.services.rag_qa import answer_with_rag
+from backend.services.report_generator import REPORT_MODES, create_report_from_json, create_report_map_reduce
+from backend.services.rag_qa import answer_batch, answer_with_rag, iter_answer_batch, stream_answer_with_rag
+from backend.services.embeddings import close_encode_pools, get_embedder, vector_store_cache
+from backend.services.embedding_cache import embedding_cache
+from backend.services.jobs import job_manager
+from backend.services.answer_cache import answer_cache
+from backend.services.metrics import register_gauges, render_prometheus, request_seconds, trace_id_var
+from backend.services.pipeline import run_pipeline
+from backend.services.multi_company import build_shared_index, reset_shared_index, search_companies
 
 app = FastAPI()
 
@@ -22,27 +37,91 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    # Echo the caller's trace ID or mint one; slow and failed spans log it (see metrics.span),
+    # so a slow response can be matched to the stages that made it slow
+    trace_id = request.headers.get("X-Trace-Id") or uuid.uuid4().hex
+    token = trace_id_var.set(trace_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Trace-Id"] = trace_id
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        request_seconds.observe(time.perf_counter() - start, request.method, path, str(status))
+        trace_id_var.reset(token)
+
+register_gauges("research_search_cache", search_cache.stats)
+register_gauges("research_embedding_cache", embedding_cache.stats)
+register_gauges("research_answer_cache", answer_cache.stats)
+register_gauges("research_vector_store_cache", vector_store_cache.stats)
+register_gauges("research_provider_circuits", provider_health.stats)
+register_gauges("research_rate_limit", rate_limiter.gauges)
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+def startup():
+    # Load the embedding model up front so the first /ask/ or /build-rag/ does not pay for it
+    get_embedder()
+
+@app.on_event("shutdown")
+def shutdown():
+    job_manager.shutdown()
+    close_sessions()
+    close_encode_pools()
+
 @app.get("/generate-queries/")
 def get_queries(company: str = Query(..., description="Company name")):
     queries = generate_query_list(company)
     return {"company": company, "queries": queries}
 
 @app.get("/search/")
-def run_search(query: str):
+def run_search(query: str, strategy: Optional[str] = None):
     try:
-        results = search_web(query)
+        results = search_web(query, strategy=strategy)
         return {"query": query, "results": results}
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/search-cache/stats")
+def get_search_cache_stats():
+    return search_cache.stats()
+
+@app.delete("/search-cache/")
+def clear_search_cache():
+    search_cache.clear()
+    return {"status": "success"}
+
+@app.get("/health/providers")
+def get_provider_health():
+    return provider_health.snapshot()
+
+@app.delete("/health/providers")
+def reset_provider_health(provider: Optional[str] = None):
+    provider_health.reset(provider)
+    return {"status": "success"}
+
+@app.get("/rate-limits/")
+def get_rate_limits():
+    return rate_limiter.stats()
+
 class BulkSearchRequest(BaseModel):
     company: str
     questions: list
+    strategy: Optional[str] = None
 
 @app.post("/search-all/")
 def search_all_questions(payload: BulkSearchRequest):
     try:
-        path = bulk_search_questions(payload.company, payload.questions)
+        path = bulk_search_questions(payload.company, payload.questions, strategy=payload.strategy)
         return {"status": "success", "filepath": path}
     except Exception as e:
         return {"status": "error", "error": str(e)}
@@ -60,20 +139,40 @@ def get_search_results(filepath: str):
 class RAGBuildRequest(BaseModel):
     company: str
     filepath: str
+    incremental: bool = False
+    index_type: Optional[str] = None
 
 @app.post("/build-rag/")
 def build_rag_index(payload: RAGBuildRequest):
     try:
-        path = build_faiss_index(payload.company, payload.filepath)
+        path = build_faiss_index(
+            payload.company, payload.filepath, incremental=payload.incremental, index_type=payload.index_type
+        )
         return {"status": "success", "index_path": path}
     except Exception as e:
         return {"status": "error", "error": str(e)}
     
 
+class PipelineRequest(BaseModel):
+    company: str
+    questions: Optional[list] = None
+    strategy: Optional[str] = None
+    index_type: Optional[str] = None
+
+@app.post("/pipeline/")
+def run_research_pipeline(payload: PipelineRequest):
+    try:
+        result = run_pipeline(payload.company, payload.questions, payload.strategy, payload.index_type)
+        return {"status": "success", **result}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
 @app.get("/generate-report/")
-def generate_company_report(filepath: str):
+def generate_company_report(filepath: str, mode: str = "single"):
     try:
-        report = create_report_from_json(filepath)
+        if mode not in REPORT_MODES:
+            raise ValueError(f"Unknown report mode '{mode}', expected one of {REPORT_MODES}")
+        report = create_report_map_reduce(filepath) if mode == "map_reduce" else create_report_from_json(filepath)
         return {"status": "success", "report": report}
     except Exception as e:
         return {"status": "error", "error": str(e)}
@@ -85,3 +184,148 @@ def ask_rag(company: str = Body(...), question: str = Body(...)):
         return {"status": "success", "answer": answer}
     except Exception as e:
         return {"status": "error", "error": str(e)}
+
+class BatchAskRequest(BaseModel):
+    company: str
+    questions: List[str]
+    k: int = 5
+    stream: bool = False
+
+@app.post("/ask-batch/")
+def ask_rag_batch(payload: BatchAskRequest):
+    """Answer many questions for one company; `stream` returns NDJSON lines as answers finish."""
+    if payload.stream:
+        def lines():
+            try:
+                for position, result in iter_answer_batch(payload.company, payload.questions, k=payload.k):
+                    yield json.dumps({"index": position, **result}, ensure_ascii=False) + "\n"
+            except Exception as e:
+                yield json.dumps({"error": str(e)}) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    try:
+        start = time.perf_counter()
+        answers = answer_batch(payload.company, payload.questions, k=payload.k)
+        return {"status": "success", "answers": answers, "seconds": round(time.perf_counter() - start, 2)}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+class SharedIndexRequest(BaseModel):
+    companies: Optional[List[str]] = None
+    num_shards: Optional[int] = None
+
+@app.post("/shared-index/build")
+def build_shared_company_index(payload: SharedIndexRequest):
+    try:
+        result = build_shared_index(payload.companies, payload.num_shards)
+        reset_shared_index()
+        return {"status": "success", **result}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+class CompanySearchRequest(BaseModel):
+    query: str
+    companies: Optional[List[str]] = None
+    k: int = 10
+
+@app.post("/search-companies/")
+def search_across_companies(payload: CompanySearchRequest):
+    try:
+        return {"status": "success", **search_companies(payload.query, payload.k, payload.companies)}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+def _sse(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/ask-stream/")
+async def ask_rag_stream(company: str = Body(...), question: str = Body(...)):
+    """Server-sent events: one `data` message per answer fragment, then `done` with timings."""
+    async def events():
+        start = time.perf_counter()
+        first_token_ms = None
+        try:
+            async for text in stream_answer_with_rag(company, question):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                    print(f"[INFO] /ask-stream/ time to first token: {first_token_ms:.0f} ms")
+                yield _sse({"text": text})
+            yield _sse({"ttft_ms": first_token_ms, "total_ms": (time.perf_counter() - start) * 1000}, event="done")
+        except Exception as e:
+            yield _sse({"error": str(e)}, event="error")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/vector-store-cache/stats")
+def get_vector_store_cache_stats():
+    return vector_store_cache.stats()
+
+@app.get("/answer-cache/stats")
+def get_answer_cache_stats():
+    return answer_cache.stats()
+
+@app.get("/embedding-cache/stats")
+def get_embedding_cache_stats():
+    return embedding_cache.stats()
+
+# --- Background jobs: long-running stages submitted here and polled for progress ---
+
+def _search_all_job(progress, company: str, questions: list, strategy: str = None):
+    def on_progress(done, total):
+        progress("questions searched", done, total)
+    return {"filepath": bulk_search_questions(company, questions, strategy=strategy, progress_callback=on_progress)}
+
+def _build_rag_job(progress, company: str, filepath: str, incremental: bool = False, index_type: str = None):
+    def on_progress(done, total):
+        progress("chunks embedded", done, total)
+    path = build_faiss_index(company, filepath, incremental=incremental, index_type=index_type, progress_callback=on_progress)
+    return {"index_path": path}
+
+def _generate_report_job(progress, filepath: str, mode: str = "single"):
+    if mode == "map_reduce":
+        def on_progress(done, total):
+            progress("sections written", done, total)
+        return {"report": create_report_map_reduce(filepath, progress_callback=on_progress)}
+    return {"report": create_report_from_json(filepath)}
+
+def _pipeline_job(progress, company: str, questions: list = None, strategy: str = None, index_type: str = None):
+    return run_pipeline(company, questions, strategy, index_type, progress_callback=progress)
+
+job_manager.register("search-all", _search_all_job)
+job_manager.register("build-rag", _build_rag_job)
+job_manager.register("generate-report", _generate_report_job)
+job_manager.register("pipeline", _pipeline_job)
+
+@app.post("/jobs/{kind}")
+def submit_job(kind: str, params: dict = Body(...)):
+    try:
+        job_id = job_manager.submit(kind, params)
+        return {"status": "success", "job_id": job_id}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+@app.get("/jobs/")
+def list_jobs(limit: int = 50):
+    return {"jobs": job_manager.list(limit)}
+
+@app.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = job_manager.get(job_id, include_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "succeeded":
+        return {"status": job["status"], "error": job["error"]}
+    return {"status": "success", **job["result"]}
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    if not job_manager.cancel(job_id):
+        return {"status": "error", "error": "Job is not queued or running"}
+    return {"status": "success"}
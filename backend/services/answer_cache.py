@@ -0,0 +1,143 @@
+"""Semantic answer cache for /ask/.
+
+Analysts ask the same questions with different wording, so answers are cached per
+company and looked up by cosine similarity of the question embedding. A similar
+question only counts as a hit if its numbers and capitalised names (years, tickers,
+products) are the same, since embeddings barely separate "FY2022" from "FY2023".
+Entries are tied to the version of the company index they were answered from and dropped when
+that index is rebuilt.
+"""
+import os
+import re
+import json
+import time
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") != "0"
+ANSWER_CACHE_DIR = os.getenv("ANSWER_CACHE_DIR", "data/cache/answers")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.92))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+
+def index_version(index_path: str) -> str:
+    """Identify an index build by its FAISS file's modification time."""
+    try:
+        return str(os.path.getmtime(os.path.join(index_path, "index.faiss")))
+    except OSError:
+        return ""
+
+_WORD = re.compile(r"[A-Za-z0-9&]+(?:[.-][A-Za-z0-9&]+)*")
+
+def key_tokens(question: str) -> frozenset:
+    """Numbers, acronyms and capitalised words (other than a sentence's first) in `question`."""
+    tokens = set()
+    for sentence in re.split(r"[.?!]\s+", question.strip()):
+        for position, word in enumerate(_WORD.findall(sentence)):
+            if any(c.isdigit() for c in word) or (len(word) > 1 and word.isupper()) or (position and word[0].isupper()):
+                tokens.add(word.lower())
+    return frozenset(tokens)
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class AnswerCache:
+    def __init__(self, cache_dir=ANSWER_CACHE_DIR, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+        self._companies = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, company: str):
+        base = os.path.join(self.cache_dir, company.replace(" ", "_"))
+        return f"{base}.json", f"{base}.npy"
+
+    def _load(self, company: str) -> dict:
+        entry = self._companies.get(company)
+        if entry is None:
+            meta_path, vectors_path = self._paths(company)
+            if os.path.exists(meta_path) and os.path.exists(vectors_path):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                entry["vectors"] = np.load(vectors_path)
+            else:
+                entry = {"version": "", "questions": [], "answers": [], "vectors": None}
+            self._companies[company] = entry
+        return entry
+
+    def _save(self, company: str, entry: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_path, vectors_path = self._paths(company)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({k: entry[k] for k in ("version", "questions", "answers")}, f, ensure_ascii=False)
+        np.save(vectors_path, entry["vectors"])
+
+    def lookup(self, company: str, question: str, query_vector, version: str):
+        """Return (answer, matched_question, similarity) for the closest cached question above the threshold, else None.
+
+        Candidates whose key tokens differ from `question`'s are skipped.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            entry = self._load(company)
+            match = None
+            if entry["vectors"] is not None and len(entry["answers"]) and entry["version"] == version:
+                similarities = entry["vectors"] @ _normalize(query_vector)
+                wanted = key_tokens(question)
+                for best in np.argsort(-similarities):
+                    if similarities[best] < self.threshold:
+                        break
+                    if key_tokens(entry["questions"][best]) == wanted:
+                        match = (entry["answers"][best], entry["questions"][best], float(similarities[best]))
+                        break
+            if match is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self.lookup_seconds += time.perf_counter() - start
+        return match
+
+    def store(self, company: str, question: str, query_vector, answer: str, version: str):
+        vector = _normalize(query_vector)[None, :]
+        with self._lock:
+            entry = self._load(company)
+            if entry["version"] != version or entry["vectors"] is None:
+                entry.update({"version": version, "questions": [], "answers": [], "vectors": vector[:0]})
+            entry["questions"].append(question)
+            entry["answers"].append(answer)
+            entry["vectors"] = np.vstack([entry["vectors"], vector])
+            if len(entry["answers"]) > self.max_entries:
+                # Oldest answers go first
+                for key in ("questions", "answers"):
+                    entry[key] = entry[key][-self.max_entries:]
+                entry["vectors"] = entry["vectors"][-self.max_entries:]
+            self._save(company, entry)
+
+    def invalidate(self, company: str):
+        with self._lock:
+            self._companies.pop(company, None)
+            for path in self._paths(company):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "companies_loaded": len(self._companies),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "avg_lookup_ms": self.lookup_seconds / lookups * 1000 if lookups else 0.0,
+                "threshold": self.threshold,
+            }
+
+answer_cache = AnswerCache()
@@ -0,0 +1,252 @@
+"""Research many companies in one unattended run.
+
+Usage:
+    python -m backend.services.batch_runner companies.csv
+    python -m backend.services.batch_runner companies.csv --concurrency 6 --overlap --report-mode map_reduce
+
+The CSV needs a `company` column (otherwise its first column is used). Each company
+goes through query generation, bulk search, indexing and report writing, and its
+checkpoint file is rewritten after every stage, so running the same command again
+after a crash or Ctrl-C only does the work that is left.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from dotenv import load_dotenv
+from backend.services.bulk_search import bulk_search_questions
+from backend.services.pipeline import run_pipeline
+from backend.services.query_generator import generate_query_list
+from backend.services.rag_pipeline import build_faiss_index
+from backend.services.report_generator import REPORT_MODES, create_report_from_json, create_report_map_reduce
+
+load_dotenv()
+
+STAGES = ("queries", "search", "index", "report")
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+BATCH_RUN_DIR = os.getenv("BATCH_RUN_DIR", "data/batch")
+REPORT_DIR = os.getenv("REPORT_DIR", "data/reports")
+BATCH_STAGE_RETRIES = int(os.getenv("BATCH_STAGE_RETRIES", 1))
+BATCH_RETRY_DELAY = float(os.getenv("BATCH_RETRY_DELAY", 10))
+NOT_A_COMPANY = "does not appear to be a real company"
+
+class NotACompany(ValueError):
+    """Query generation rejected the name; retrying will not help."""
+
+def read_companies(csv_path: str) -> list:
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    column = header.index("company") if "company" in header else 0
+    body = rows[1:] if "company" in header else rows
+    names = [row[column].strip() for row in body if len(row) > column and row[column].strip()]
+    return list(dict.fromkeys(names))
+
+def company_slug(company: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", company).strip("_") or "company"
+
+class Checkpoint:
+    """Per-company progress file: finished stages with their outputs, and the last error."""
+
+    def __init__(self, path: str, company: str):
+        self.path = path
+        self.state = {"company": company, "stages": {}, "error": None}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def output(self, stage: str, key: str):
+        return self.state["stages"].get(stage, {}).get(key)
+
+    def is_done(self, stage: str) -> bool:
+        """A stage counts as done only while its output is still on disk."""
+        if stage not in self.state["stages"]:
+            return False
+        if stage == "queries":
+            return bool(self.output("queries", "questions"))
+        path = self.output(stage, {"search": "filepath", "index": "index_path", "report": "report_path"}[stage])
+        return bool(path) and os.path.exists(path)
+
+    def complete(self, stage: str, seconds: float, **outputs):
+        self.state["stages"][stage] = {**outputs, "seconds": round(seconds, 2), "finished_at": datetime.now().isoformat(timespec="seconds")}
+        self.state["error"] = None
+        self.save()
+
+    def fail(self, stage: str, error: Exception):
+        self.state["error"] = {"stage": stage, "message": str(error), "at": datetime.now().isoformat(timespec="seconds")}
+        self.save()
+
+    def reject(self, error: Exception):
+        """Mark the company as not researchable, so later runs skip it."""
+        self.state["rejected"] = str(error)
+        self.fail("queries", error)
+
+    def finished(self) -> bool:
+        return bool(self.state.get("rejected")) or all(self.is_done(stage) for stage in STAGES)
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+def _generate_questions(company: str) -> list:
+    questions = generate_query_list(company)
+    if any(NOT_A_COMPANY in q for q in questions):
+        raise NotACompany(f"'{company}' does not look like a real company")
+    if not questions:
+        raise ValueError(f"No questions generated for {company}")
+    return questions
+
+def _write_report(company: str, filepath: str, report_mode: str) -> str:
+    report = create_report_map_reduce(filepath) if report_mode == "map_reduce" else create_report_from_json(filepath)
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_path = os.path.join(REPORT_DIR, f"{company_slug(company)}_report.md")
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(report)
+    return report_path
+
+def _run_stage(checkpoint: Checkpoint, stage: str, options: dict):
+    company = checkpoint.state["company"]
+    start = time.perf_counter()
+    if stage == "queries":
+        checkpoint.complete(stage, time.perf_counter() - start, questions=_generate_questions(company))
+    elif stage == "search" and options["overlap"]:
+        # Search and index in one overlapped pass; both stages are checkpointed together
+        result = run_pipeline(
+            company, checkpoint.output("queries", "questions"), options["strategy"], options["index_type"], options["search_workers"]
+        )
+        elapsed = time.perf_counter() - start
+        checkpoint.complete("search", elapsed, filepath=result["filepath"])
+        checkpoint.complete("index", 0.0, index_path=result["index_path"], chunks=result["chunks"])
+    elif stage == "search":
+        filepath = bulk_search_questions(
+            company, checkpoint.output("queries", "questions"), max_workers=options["search_workers"], strategy=options["strategy"]
+        )
+        checkpoint.complete(stage, time.perf_counter() - start, filepath=filepath)
+    elif stage == "index":
+        # Incremental, so a retry after a partial build reuses what was already embedded
+        index_path = build_faiss_index(
+            company, checkpoint.output("search", "filepath"), incremental=True, index_type=options["index_type"]
+        )
+        checkpoint.complete(stage, time.perf_counter() - start, index_path=index_path)
+    else:
+        report_path = _write_report(company, checkpoint.output("search", "filepath"), options["report_mode"])
+        checkpoint.complete(stage, time.perf_counter() - start, report_path=report_path)
+
+def research_company(company: str, checkpoint_dir: str, options: dict, stop: threading.Event) -> dict:
+    """Run the stages `company` has not finished yet; returns its checkpoint state."""
+    checkpoint = Checkpoint(os.path.join(checkpoint_dir, f"{company_slug(company)}.json"), company)
+    for stage in STAGES:
+        if checkpoint.is_done(stage):
+            continue
+        # A later stage's input was lost (e.g. the scrape file was deleted): redo from here
+        for later in STAGES[STAGES.index(stage) + 1:]:
+            checkpoint.state["stages"].pop(later, None)
+        for attempt in range(options["retries"] + 1):
+            if stop.is_set():
+                return checkpoint.state
+            try:
+                print(f"[INFO] {company}: {stage}")
+                _run_stage(checkpoint, stage, options)
+                break
+            except NotACompany as e:
+                checkpoint.reject(e)
+                return checkpoint.state
+            except Exception as e:
+                checkpoint.fail(stage, e)
+                print(f"[WARN] {company}: {stage} failed (attempt {attempt + 1}): {e}")
+                if attempt == options["retries"]:
+                    return checkpoint.state
+                time.sleep(options["retry_delay"] * (attempt + 1))
+    return checkpoint.state
+
+def run_batch(csv_path: str, run_dir: str = None, concurrency: int = BATCH_CONCURRENCY, **options) -> dict:
+    """Research every company in `csv_path`; returns a summary also written to <run_dir>/summary.json."""
+    companies = read_companies(csv_path)
+    run_dir = run_dir or os.path.join(BATCH_RUN_DIR, os.path.splitext(os.path.basename(csv_path))[0])
+    checkpoint_dir = os.path.join(run_dir, "checkpoints")
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    options = {
+        "overlap": False, "strategy": None, "index_type": None, "search_workers": None, "report_mode": "single",
+        "retries": BATCH_STAGE_RETRIES, "retry_delay": BATCH_RETRY_DELAY, **options,
+    }
+
+    pending = [c for c in companies if not Checkpoint(os.path.join(checkpoint_dir, f"{company_slug(c)}.json"), c).finished()]
+    print(f"[INFO] {len(companies)} companies, {len(companies) - len(pending)} already done or rejected, {len(pending)} to research")
+
+    stop = threading.Event()
+    finished, failed = [], {}
+    start = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(pending) or 1)), thread_name_prefix="batch")
+    try:
+        futures = {pool.submit(research_company, company, checkpoint_dir, options, stop): company for company in pending}
+        for future in as_completed(futures):
+            company = futures[future]
+            try:
+                state = future.result()
+            except Exception as e:
+                state = {"error": {"stage": None, "message": str(e)}}
+            if state.get("error"):
+                failed[company] = state["error"]
+            elif not stop.is_set():
+                finished.append(company)
+            hours = (time.perf_counter() - start) / 3600
+            rate = len(finished) / hours if hours else 0.0
+            remaining = len(pending) - len(finished) - len(failed)
+            eta = f", ETA {remaining / rate:.1f}h" if rate and remaining else ""
+            print(f"[INFO] {len(finished)}/{len(pending)} companies done, {len(failed)} failed, {rate:.1f} companies/hour{eta}")
+    except KeyboardInterrupt:
+        # Running companies stop at their next stage boundary; their checkpoints stay valid
+        print("[WARN] Interrupted: finishing in-flight stages, rerun the same command to resume")
+        stop.set()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "csv": csv_path,
+        "companies": len(companies),
+        "already_done_or_rejected": len(companies) - len(pending),
+        "finished": len(finished),
+        "failed": failed,
+        "unfinished": len(pending) - len(finished) - len(failed),
+        "seconds": round(elapsed, 1),
+        "companies_per_hour": round(len(finished) / (elapsed / 3600), 2) if elapsed and finished else 0.0,
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(os.path.join(run_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(f"[INFO] Batch done: {summary['finished']} finished, {len(failed)} failed, "
+          f"{summary['unfinished']} unfinished in {elapsed / 60:.1f} min ({summary['companies_per_hour']} companies/hour)")
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Research every company in a CSV with resumable per-stage checkpoints")
+    parser.add_argument("csv", help="CSV with a 'company' column (or company names in the first column)")
+    parser.add_argument("--run-dir", help=f"Checkpoint and summary directory (default: {BATCH_RUN_DIR}/<csv name>)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Companies researched at once")
+    parser.add_argument("--search-workers", type=int, help="Concurrent searches per company")
+    parser.add_argument("--strategy", help="Search strategy (sequential, hedged or race)")
+    parser.add_argument("--index-type", help="FAISS index type")
+    parser.add_argument("--report-mode", choices=REPORT_MODES, default="single")
+    parser.add_argument("--overlap", action="store_true", help="Embed while searching (search and index as one stage)")
+    parser.add_argument("--retries", type=int, default=BATCH_STAGE_RETRIES, help="Retries per failed stage")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(
+        args.csv, args.run_dir, args.concurrency,
+        overlap=args.overlap, strategy=args.strategy, index_type=args.index_type,
+        search_workers=args.search_workers, report_mode=args.report_mode, retries=args.retries,
+    )
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+"""Per-company BM25 keyword index, stored next to the FAISS index.
+
+Catches exact-match queries (tickers, executive names, figures) that MiniLM
+embeddings blur, and is fused with vector hits by reciprocal rank.
+"""
+import os
+import re
+import json
+import math
+import heapq
+
+BM25_FILENAME = "bm25.json"
+# Keep tokens like "techm.ns", "5.2" and "r&d" whole
+_TOKEN = re.compile(r"\w+(?:[.&'-]\w+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were what which who with".split()
+)
+
+def tokenize(text: str) -> list:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self.doc_lengths = []
+        self.postings = {}
+        self.avg_length = 0.0
+
+    @classmethod
+    def build(cls, doc_ids: list, texts: list, k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        index = cls(k1, b)
+        for position, (doc_id, text) in enumerate(zip(doc_ids, texts)):
+            tokens = tokenize(text)
+            index.doc_ids.append(doc_id)
+            index.doc_lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                index.postings.setdefault(token, []).append((position, tf))
+        index.avg_length = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        return index
+
+    def _idf(self, doc_freq: int) -> float:
+        n = len(self.doc_ids)
+        return math.log(1 + (n - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def search(self, query: str, k: int = 10) -> list:
+        """Return up to k (doc_id, score) pairs, best first; only documents sharing a term score."""
+        scores = {}
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = self._idf(len(postings))
+            for position, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / (self.avg_length or 1))
+                scores[position] = scores.get(position, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[position], score) for position, score in best]
+
+    def save(self, index_path: str):
+        payload = {
+            "k1": self.k1,
+            "b": self.b,
+            "doc_ids": self.doc_ids,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+        }
+        with open(os.path.join(index_path, BM25_FILENAME), "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, index_path: str):
+        path = os.path.join(index_path, BM25_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        index = cls(payload["k1"], payload["b"])
+        index.doc_ids = payload["doc_ids"]
+        index.doc_lengths = payload["doc_lengths"]
+        index.postings = {token: [tuple(p) for p in postings] for token, postings in payload["postings"].items()}
+        index.avg_length = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        return index
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """Fuse ranked ID lists; returns (doc_id, score) pairs, best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,27 +1,49 @@
 import os
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from backend.services.search_engine import search_web
+from backend.services.storage import scrape_extension, write_scrape
 
-def bulk_search_questions(company: str, questions: list, save_dir="data/scraped_content") -> str:
-    os.makedirs(save_dir, exist_ok=True)
-    results = {}
+# Questions searched in parallel per bulk run; per-provider caps live in search_engine.
+# The default covers a full generated list (12-15 questions) in one wave, so a bulk
+# search takes about as long as its slowest question.
+BULK_SEARCH_CONCURRENCY = int(os.getenv("BULK_SEARCH_CONCURRENCY", 15))
+
+def search_question(idx: int, question: str, strategy: str = None) -> list:
+    print(f"Searching Q{idx}: {question}")
+    try:
+        return search_web(question, strategy=strategy)
+    except Exception as e:
+        return [{"error": str(e)}]
+
+def bulk_search_questions(company: str, questions: list, save_dir="data/scraped_content", max_workers: int = None, strategy: str = None, progress_callback=None) -> str:
+    """Search every question concurrently and save the results; returns the saved file path.
 
-    for idx, question in enumerate(questions, 1):
-        print(f"Searching Q{idx}: {question}")
-        try:
-            search_results = search_web(question)
-            results[question] = search_results
-        except Exception as e:
-            results[question] = [{"error": str(e)}]
+    `progress_callback(done, total)` is called as each question finishes.
+    """
+    max_workers = max_workers or BULK_SEARCH_CONCURRENCY
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(questions) or 1)))
+    try:
+        futures = [pool.submit(search_question, idx, question, strategy) for idx, question in enumerate(questions, 1)]
+        if progress_callback:
+            for done, _ in enumerate(as_completed(futures), 1):
+                progress_callback(done, len(questions))
+        # Collect in submission order so the saved JSON keeps the question order
+        results = {question: future.result() for question, future in zip(questions, futures)}
+    finally:
+        # If the callback raised (e.g. a cancelled job), drop the searches not yet started
+        pool.shutdown(wait=True, cancel_futures=True)
 
-    # Save results to a JSON file
+    return save_search_results(company, results, save_dir)
+
+def save_search_results(company: str, results: dict, save_dir="data/scraped_content") -> str:
+    # Save results in the configured scrape format (see storage.SCRAPE_FORMAT)
+    os.makedirs(save_dir, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{company.replace(' ', '_')}_{timestamp}.json"
+    filename = f"{company.replace(' ', '_')}_{timestamp}{scrape_extension()}"
     filepath = os.path.join(save_dir, filename)
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    write_scrape(filepath, results)
 
     print(f"All search results saved to: {filepath}")
-    return filepath
\ No newline at end of file
+    return filepath
@@ -0,0 +1,95 @@
+"""Token-budgeted context assembly for RAG prompts.
+
+Retrieved chunks are packed greedily in relevance order until the token budget
+is spent. Text a chunk shares with an already packed chunk of the same question
+(the splitter's chunk_overlap) is trimmed, exact and near-duplicate chunks are
+skipped, and every chunk is labelled with the question and source it came from.
+"""
+import os
+import re
+from dotenv import load_dotenv
+from backend.services.dedup import content_hash, simhash
+from backend.services.metrics import span
+from backend.services.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+load_dotenv()
+
+CONTEXT_PACKING = os.getenv("CONTEXT_PACKING", "1") != "0"
+# Sized for k=5 unique ~500-char chunks plus labels, so only duplicates and splitter
+# overlap are cut, never a relevant chunk
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 800))
+# Candidates retrieved per requested chunk; the spares replace chunks dropped as duplicates
+CONTEXT_CANDIDATE_FACTOR = int(os.getenv("CONTEXT_CANDIDATE_FACTOR", 2))
+CONTEXT_SIMHASH_MAX_DISTANCE = int(os.getenv("CONTEXT_SIMHASH_MAX_DISTANCE", 3))
+# Shorter shared runs are coincidence, not splitter overlap
+MIN_OVERLAP_CHARS = 20
+_SOURCE = re.compile(r"\(Source: ([^)\s]+)\)")
+
+def source_label(doc, position: int) -> str:
+    label = f"[{position}] Q{doc.metadata.get('qid', '?')}: {doc.metadata.get('question', '')}"
+    urls = list(dict.fromkeys(_SOURCE.findall(doc.page_content)))
+    if urls:
+        label += f" (Source: {', '.join(urls[:2])})"
+    return label
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is also a prefix of `right`."""
+    for size in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+def _trim_overlap(text: str, neighbours: list) -> str:
+    for packed in neighbours:
+        text = text[_overlap(packed, text):]
+        cut = _overlap(text, packed)
+        if cut:
+            text = text[:-cut]
+    return text.strip()
+
+def select_chunks(docs: list, budget: int = CONTEXT_TOKEN_BUDGET, max_chunks: int = None, max_distance: int = CONTEXT_SIMHASH_MAX_DISTANCE) -> list:
+    """Pick (label, text) pairs from (Document, score) pairs within `budget` tokens.
+
+    Candidates are taken best score first; one that does not fit is skipped so a
+    smaller, lower-ranked chunk can still use the remaining budget.
+    """
+    ranked = sorted(docs, key=lambda pair: pair[1], reverse=True)
+    selected = []
+    packed_by_question = {}
+    hashes, fingerprints = set(), []
+    used = 0
+    for doc, _ in ranked:
+        if max_chunks and len(selected) >= max_chunks:
+            break
+        text = doc.page_content.strip()
+        digest = content_hash(text)
+        fingerprint = simhash(text)
+        if digest in hashes or any(bin(fingerprint ^ f).count("1") <= max_distance for f in fingerprints):
+            continue
+
+        qid = doc.metadata.get("qid")
+        text = _trim_overlap(text, packed_by_question.get(qid, []))
+        if len(text) < MIN_OVERLAP_CHARS:
+            continue
+        label = source_label(doc, len(selected) + 1)
+        cost = estimate_tokens(f"{label}\n{text}\n\n")
+        if used + cost > budget:
+            if selected:
+                continue
+            # Never send an empty context: cut the best chunk down to the budget
+            text = text[:max(0, budget - estimate_tokens(label) - 1) * CHARS_PER_TOKEN]
+            cost = budget
+
+        selected.append((label, text))
+        packed_by_question.setdefault(qid, []).append(text)
+        hashes.add(digest)
+        fingerprints.append(fingerprint)
+        used += cost
+        if used >= budget:
+            break
+    return selected
+
+def pack_context(docs: list, budget: int = CONTEXT_TOKEN_BUDGET, max_chunks: int = None) -> str:
+    """Build the prompt context from (Document, score) pairs."""
+    with span("pack_context"):
+        return "\n\n".join(f"{label}\n{text}" for label, text in select_chunks(docs, budget, max_chunks))
@@ -0,0 +1,137 @@
+"""Cross-question deduplication of search results.
+
+Different research questions often return the same pages. Exact duplicates are
+matched by normalized URL and by a hash of the normalized text; near-duplicates
+(e.g. the same press release syndicated on two sites) optionally by 64-bit SimHash.
+The first question to return a result keeps it, and later questions record where it went.
+"""
+import os
+import re
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from dotenv import load_dotenv
+from backend.services.tokens import CHARS_PER_TOKEN
+
+load_dotenv()
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") != "0"
+DEDUP_NEAR_DUPLICATES = os.getenv("DEDUP_NEAR_DUPLICATES", "0") != "0"
+SIMHASH_MAX_DISTANCE = int(os.getenv("SIMHASH_MAX_DISTANCE", 3))
+SIMHASH_BITS = 64
+# Four 16-bit bands: two hashes within distance 3 must agree exactly on at least one band
+SIMHASH_BANDS = 4
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|ref)$")
+_WORD = re.compile(r"\w+")
+
+def normalize_url(url: str) -> str:
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)])
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    return urlunsplit(("", netloc, parts.path.rstrip("/"), query, ""))
+
+def _normalize_text(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(_normalize_text(text).encode("utf-8")).hexdigest()
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    words = _WORD.findall(text.lower())
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))]
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+def _bands(value: int) -> list:
+    width = SIMHASH_BITS // SIMHASH_BANDS
+    return [(band, value >> (band * width) & ((1 << width) - 1)) for band in range(SIMHASH_BANDS)]
+
+class Deduplicator:
+    """Streaming duplicate detector; feed results in question order with `check`."""
+
+    def __init__(self, near_duplicates: bool = DEDUP_NEAR_DUPLICATES, max_distance: int = SIMHASH_MAX_DISTANCE):
+        self.near_duplicates = near_duplicates
+        self.max_distance = max_distance
+        self._by_key = {}
+        self._buckets = {}
+        self.kept = 0
+        self.dropped = 0
+        self.exact = 0
+        self.near = 0
+        self.chars_saved = 0
+
+    def _item_text(self, item: dict) -> str:
+        return f"{item.get('title', '')}\n{item.get('content', '')}"
+
+    def check(self, question: str, item: dict):
+        """Return the question that first returned this result, or None if it is new."""
+        text = self._item_text(item)
+        keys = [f"url:{normalize_url(item.get('url', ''))}"] if item.get("url") else []
+        if item.get("content", "").strip():
+            keys.append(f"text:{content_hash(text)}")
+
+        for key in keys:
+            if key in self._by_key:
+                return self._drop(item, self._by_key[key], near=False)
+
+        fingerprint = None
+        if self.near_duplicates and item.get("content", "").strip():
+            fingerprint = simhash(text)
+            for band in _bands(fingerprint):
+                for other, owner in self._buckets.get(band, []):
+                    if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                        return self._drop(item, owner, near=True)
+
+        for key in keys:
+            self._by_key.setdefault(key, question)
+        if fingerprint is not None:
+            for band in _bands(fingerprint):
+                self._buckets.setdefault(band, []).append((fingerprint, question))
+        self.kept += 1
+        return None
+
+    def _drop(self, item: dict, owner: str, near: bool) -> str:
+        self.dropped += 1
+        if near:
+            self.near += 1
+        else:
+            self.exact += 1
+        self.chars_saved += len(item.get("content", ""))
+        return owner
+
+    def stats(self, chunk_size: int = 500, chunk_overlap: int = 50) -> dict:
+        return {
+            "results_kept": self.kept,
+            "duplicates_dropped": self.dropped,
+            "exact_duplicates": self.exact,
+            "near_duplicates": self.near,
+            "tokens_saved": -(-self.chars_saved // CHARS_PER_TOKEN),
+            # Approximate: chunks the dropped text would have produced at this chunk size
+            "chunks_saved": -(-self.chars_saved // max(1, chunk_size - chunk_overlap)),
+        }
+
+def dedupe_scrape(data: dict, top_k: int = 3, near_duplicates: bool = DEDUP_NEAR_DUPLICATES):
+    """Deduplicate the top_k results of every question across the whole scrape.
+
+    Returns (kept, provenance, stats): `kept` maps each question to its unique
+    results, and `provenance` maps each question to the earlier questions whose
+    results it repeated, in order.
+    """
+    dedup = Deduplicator(near_duplicates)
+    kept, provenance = {}, {}
+    for question, results in data.items():
+        kept[question], provenance[question] = [], []
+        for item in results[:top_k]:
+            owner = dedup.check(question, item)
+            if owner is None:
+                kept[question].append(item)
+            elif owner != question and owner not in provenance[question]:
+                provenance[question].append(owner)
+    return kept, provenance, dedup.stats()
@@ -0,0 +1,222 @@
+import os
+import threading
+from collections import OrderedDict
+import faiss
+import numpy as np
+from langchain.vectorstores import FAISS
+from langchain.embeddings import HuggingFaceEmbeddings
+from dotenv import load_dotenv
+from backend.services.bm25 import BM25Index
+from backend.services.metrics import span
+from backend.services.embedding_cache import EMBEDDING_CACHE_ENABLED, embedding_cache, text_hash
+
+load_dotenv()
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+INDEX_DIR = "embeddings/faiss_index"
+# Texts per forward pass and encode processes for index builds (1 = in-process)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", 1))
+EMBED_PRECISIONS = ("float32", "float16", "int8")
+# Query-time recall/speed knobs for IVF and HNSW indexes
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", 8))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", 64))
+# Upper bound on memory held by loaded per-company vector stores
+VECTOR_STORE_CACHE_MB = float(os.getenv("VECTOR_STORE_CACHE_MB", 512))
+
+class CachedHuggingFaceEmbeddings(HuggingFaceEmbeddings):
+    """HuggingFaceEmbeddings that routes documents and queries through the embedding cache."""
+
+    def embed_documents(self, texts):
+        return encode_texts(list(texts), model_name=self.model_name, workers=1).tolist()
+
+_embedders = {}
+_embedder_lock = threading.Lock()
+
+def get_embedder(model_name: str = EMBEDDING_MODEL_NAME) -> CachedHuggingFaceEmbeddings:
+    """Process-wide embedding model, loaded once per model name."""
+    embedder = _embedders.get(model_name)
+    if embedder is None:
+        with _embedder_lock:
+            embedder = _embedders.get(model_name)
+            if embedder is None:
+                print(f"[INFO] Loading embedding model: {model_name}")
+                embedder = _embedders[model_name] = CachedHuggingFaceEmbeddings(model_name=model_name)
+    return embedder
+
+_encode_pools = {}
+
+def _encode_pool(model_name: str, workers: int):
+    key = (model_name, workers)
+    model = get_embedder(model_name).client
+    with _embedder_lock:
+        pool = _encode_pools.get(key)
+        if pool is None:
+            pool = _encode_pools[key] = model.start_multi_process_pool(target_devices=["cpu"] * workers)
+    return pool
+
+def close_encode_pools():
+    from sentence_transformers import SentenceTransformer
+
+    with _embedder_lock:
+        for pool in _encode_pools.values():
+            SentenceTransformer.stop_multi_process_pool(pool)
+        _encode_pools.clear()
+
+def _quantize(vectors: np.ndarray, precision: str) -> np.ndarray:
+    if precision == "float32":
+        return vectors
+    if precision == "float16":
+        return vectors.astype(np.float16)
+    if precision == "int8":
+        from sentence_transformers.quantization import quantize_embeddings
+
+        return quantize_embeddings(vectors, precision="int8")
+    raise ValueError(f"Unknown precision '{precision}', expected one of {EMBED_PRECISIONS}")
+
+def _encode_uncached(texts, embedder, batch_size, workers, progress_callback) -> np.ndarray:
+    with span("embed", "pool" if workers > 1 else "local"):
+        return _encode_blocks(texts, embedder, batch_size, workers, progress_callback)
+
+def _encode_blocks(texts, embedder, batch_size, workers, progress_callback) -> np.ndarray:
+    model = embedder.client
+    pool = _encode_pool(embedder.model_name, workers) if workers > 1 else None
+    block_size = batch_size * max(workers, 1) * 4
+    blocks = []
+    for start in range(0, len(texts), block_size):
+        block = texts[start:start + block_size]
+        if pool is not None:
+            vectors = model.encode_multi_process(
+                block, pool, batch_size=batch_size,
+                normalize_embeddings=embedder.encode_kwargs.get("normalize_embeddings", False),
+            )
+        else:
+            vectors = model.encode(block, batch_size=batch_size, convert_to_numpy=True, **embedder.encode_kwargs)
+        blocks.append(vectors)
+        if progress_callback:
+            progress_callback(min(start + block_size, len(texts)), len(texts))
+    return np.ascontiguousarray(np.vstack(blocks), dtype=np.float32)
+
+def encode_texts(
+    texts: list,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    batch_size: int = None,
+    workers: int = None,
+    precision: str = "float32",
+    progress_callback=None,
+    use_cache: bool = EMBEDDING_CACHE_ENABLED,
+) -> np.ndarray:
+    """Embed texts in explicit batches, optionally across a pool of encode processes.
+
+    Vectors already in the embedding cache are reused and only the misses are encoded.
+    Returns a contiguous (len(texts), dim) array. FAISS needs float32; float16/int8 are
+    for compact storage only. `progress_callback(done, total)` is called after each block.
+    """
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    workers = workers or EMBED_WORKERS
+    embedder = get_embedder(model_name)
+    dim = embedder.client.get_sentence_embedding_dimension()
+    if not texts:
+        return np.zeros((0, dim), dtype=np.float32)
+    if not use_cache:
+        return _quantize(_encode_uncached(texts, embedder, batch_size, workers, progress_callback), precision)
+
+    hashes = [text_hash(text) for text in texts]
+    cached = embedding_cache.get_many(model_name, hashes)
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    missing = {}
+    for i, key in enumerate(hashes):
+        if key in cached:
+            vectors[i] = cached[key]
+        else:
+            missing.setdefault(key, []).append(i)
+
+    if missing:
+        first_rows = [rows[0] for rows in missing.values()]
+        encoded = _encode_uncached([texts[i] for i in first_rows], embedder, batch_size, workers, progress_callback)
+        embedding_cache.put_many(model_name, list(missing), encoded)
+        for rows, vector in zip(missing.values(), encoded):
+            vectors[rows] = vector
+    elif progress_callback:
+        progress_callback(len(texts), len(texts))
+    return _quantize(vectors, precision)
+
+def apply_search_params(index, nprobe: int = None, ef_search: int = None):
+    """Set nprobe on IVF indexes and efSearch on HNSW indexes; flat indexes are left alone."""
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe or FAISS_NPROBE
+    except RuntimeError:
+        pass
+    hnsw_index = faiss.downcast_index(index)
+    if isinstance(hnsw_index, faiss.IndexHNSW):
+        hnsw_index.hnsw.efSearch = ef_search or FAISS_EF_SEARCH
+
+def index_path_for(company: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, f"{company.replace(' ', '_')}_faiss_index")
+
+def estimate_store_bytes(vectorstore) -> int:
+    index = vectorstore.index
+    vector_bytes = index.ntotal * index.d * 4
+    text_bytes = sum(len(doc.page_content) for doc in vectorstore.docstore._dict.values())
+    # BM25 postings are roughly as large as the tokenized text
+    keyword_bytes = text_bytes if getattr(vectorstore, "bm25", None) is not None else 0
+    return vector_bytes + text_bytes + keyword_bytes
+
+class VectorStoreCache:
+    """LRU of loaded FAISS stores keyed by index path, bounded by estimated memory."""
+
+    def __init__(self, max_bytes: int = int(VECTOR_STORE_CACHE_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, index_path: str, loader):
+        key = os.path.normpath(index_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        vectorstore = loader(index_path)
+        with self._lock:
+            self._entries[key] = (vectorstore, estimate_store_bytes(vectorstore))
+            self._entries.move_to_end(key)
+            self._evict()
+        return vectorstore
+
+    def _evict(self):
+        # Always keep the most recently used store, even if it alone exceeds the budget
+        while len(self._entries) > 1 and self.total_bytes() > self.max_bytes:
+            self._entries.popitem(last=False)
+
+    def total_bytes(self) -> int:
+        return sum(size for _, size in self._entries.values())
+
+    def invalidate(self, index_path: str):
+        with self._lock:
+            self._entries.pop(os.path.normpath(index_path), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self.total_bytes(),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+vector_store_cache = VectorStoreCache()
+
+def _load_local(index_path: str):
+    vectorstore = FAISS.load_local(index_path, get_embedder(), allow_dangerous_deserialization=True)
+    # Keyword index for hybrid retrieval; None for indexes built before it existed
+    vectorstore.bm25 = BM25Index.load(index_path)
+    return vectorstore
+
+def load_vector_store(company: str, index_dir: str = INDEX_DIR):
+    return vector_store_cache.get(index_path_for(company, index_dir), _load_local)
@@ -0,0 +1,60 @@
+import os
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 16))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 2))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", 0.5))
+# Transient server errors only. A 429 goes straight back to the caller, where the
+# circuit breaker and rate limiter handle it; retrying would just burn more quota.
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_sessions = {}
+_lock = threading.Lock()
+
+def _new_session() -> requests.Session:
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        # Provider POSTs (Tavily) are read-only searches, so they are safe to retry
+        allowed_methods=frozenset({"GET", "POST"}),
+        # Retry-After can be hours on a quota error and urllib3 would sleep it out uncapped,
+        # outside the request timeout; plain backoff keeps retries within a few seconds
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session(url: str) -> requests.Session:
+    """Return the keep-alive session for the URL's host, creating it on first use."""
+    host = urlsplit(url).netloc
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = _new_session()
+    return session
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    return get_session(url).get(url, **kwargs)
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    return get_session(url).post(url, **kwargs)
+
+def close_sessions():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
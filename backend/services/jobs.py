@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "data/jobs/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+# Jobs are tagged with the process that runs them, so several server workers can share
+# the database and each only recovers jobs whose process is gone
+JOB_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def _owner_alive(owner: str) -> bool:
+    """Whether the process that owns a job may still be running it."""
+    if owner == JOB_OWNER:
+        return True
+    parts = (owner or "").split(":")
+    if len(parts) != 3 or not parts[1].isdigit():
+        # Rows from before owners were recorded
+        return False
+    host, pid = parts[0], int(parts[1])
+    if host != socket.gethostname():
+        # Another machine sharing the database; its processes cannot be checked from here
+        return True
+    if pid == os.getpid():
+        # An earlier process that had our PID
+        return False
+    if os.name == "nt":
+        # Signal 0 would terminate the process on Windows; leave its jobs alone
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class JobCancelled(Exception):
+    pass
+
+class JobManager:
+    """Runs registered pipeline stages on a worker pool and persists job state to SQLite.
+
+    A stage is `func(progress, **params) -> JSON-serializable result`, where
+    `progress(stage, done, total)` records progress and raises JobCancelled once the
+    job has been cancelled, so stages stop at their next checkpoint.
+    """
+
+    def __init__(self, path=JOB_DB_PATH, workers=JOB_WORKERS):
+        self.path = path
+        self.workers = workers
+        self._handlers = {}
+        self._futures = {}
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pool = None
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    progress TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    owner TEXT
+                )"""
+            )
+            if "owner" not in [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            # Jobs whose process has stopped will never finish; other live workers keep theirs
+            in_flight = self._conn.execute("SELECT id, owner FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+            orphaned = [(time.time(), job_id) for job_id, owner in in_flight if not _owner_alive(owner)]
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'failed', error = 'interrupted by server restart', updated_at = ? WHERE id = ?",
+                orphaned,
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db().execute(f"UPDATE jobs SET {columns} WHERE id = ?", list(fields.values()) + [job_id])
+            self._db().commit()
+
+    def register(self, kind: str, func):
+        self._handlers[kind] = func
+
+    def kinds(self) -> list:
+        return sorted(self._handlers)
+
+    def submit(self, kind: str, params: dict) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind '{kind}', expected one of {self.kinds()}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO jobs (id, kind, status, params, progress, created_at, updated_at, owner) "
+                "VALUES (?, ?, 'queued', ?, '{}', ?, ?, ?)",
+                (job_id, kind, json.dumps(params), now, now, JOB_OWNER),
+            )
+            self._db().commit()
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._futures[job_id] = self._pool.submit(self._run, job_id, kind, params)
+        return job_id
+
+    def _run(self, job_id: str, kind: str, params: dict):
+        progress_state = {}
+
+        def progress(stage: str, done: int, total: int = None):
+            if job_id in self._cancelled:
+                raise JobCancelled()
+            progress_state[stage] = {"done": done, "total": total}
+            self._update(job_id, progress=json.dumps(progress_state))
+
+        try:
+            self._update(job_id, status="running")
+            result = self._handlers[kind](progress, **params)
+            self._update(job_id, status="succeeded", result=json.dumps(result))
+        except JobCancelled:
+            self._update(job_id, status="cancelled")
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e))
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+                self._cancelled.discard(job_id)
+
+    def get(self, job_id: str, include_result: bool = False) -> dict:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT id, kind, status, params, progress, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = {
+            "id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "params": json.loads(row[3]),
+            "progress": json.loads(row[4]),
+            "error": row[6],
+            "created_at": row[7],
+            "updated_at": row[8],
+        }
+        if include_result:
+            job["result"] = json.loads(row[5]) if row[5] else None
+        return job
+
+    def list(self, limit: int = 50) -> list:
+        with self._lock:
+            ids = [r[0] for r in self._db().execute("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))]
+        return [self.get(job_id) for job_id in ids]
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is None:
+                return False
+            if future.cancel():
+                self._futures.pop(job_id, None)
+                cancelled_now = True
+            else:
+                # Already running: stop at the stage's next progress checkpoint
+                self._cancelled.add(job_id)
+                cancelled_now = False
+        if cancelled_now:
+            self._update(job_id, status="cancelled")
+        return True
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+job_manager = JobManager()
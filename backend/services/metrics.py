@@ -0,0 +1,122 @@
+"""In-process latency/cost instrumentation exposed in Prometheus text format.
+
+Wrap a stage in `with span("embed"):` to record its duration, and call
+`record_prompt_tokens` after each LLM call. `/metrics` renders everything.
+Failed spans, and spans slower than SLOW_SPAN_SECONDS, are also logged with the
+trace ID of the request they ran under.
+"""
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from backend.services.tokens import estimate_tokens
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000, 256000)
+
+# Set per HTTP request by the middleware in main; threads started by pools do not inherit it
+trace_id_var = contextvars.ContextVar("trace_id", default=None)
+SLOW_SPAN_SECONDS = float(os.getenv("SLOW_SPAN_SECONDS", 5))
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: tuple, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, label_values))
+                sep = "," if labels else ""
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {series["count"]}')
+                lines.append(f"{self.name}_sum{{{labels}}} {series['sum']}")
+                lines.append(f"{self.name}_count{{{labels}}} {series['count']}")
+        return lines
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+stage_seconds = Histogram(
+    "research_stage_duration_seconds", "Duration of pipeline stages", ("stage", "detail", "status")
+)
+prompt_tokens = Histogram(
+    "research_llm_prompt_tokens", "Prompt tokens per LLM call", ("call",), TOKEN_BUCKETS
+)
+first_token_seconds = Histogram(
+    "research_llm_time_to_first_token_seconds", "Time to first streamed token", ("call",)
+)
+request_seconds = Histogram(
+    "research_http_request_duration_seconds", "HTTP request latency", ("method", "path", "status")
+)
+
+_gauge_collectors = []
+
+def register_gauges(prefix: str, collect):
+    """Expose the numeric values of `collect()` (a dict) as gauges named `<prefix>_<key>`."""
+    _gauge_collectors.append((prefix, collect))
+
+@contextmanager
+def span(stage: str, detail: str = ""):
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except GeneratorExit:
+        # A streaming consumer stopped early
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage, detail, status)
+        if status == "error" or elapsed >= SLOW_SPAN_SECONDS:
+            label = f"{stage}/{detail}" if detail else stage
+            level = "WARN" if status == "error" else "INFO"
+            print(f"[{level}] trace={trace_id_var.get() or '-'} span {label} {status} after {elapsed:.2f}s")
+
+def record_prompt_tokens(call: str, prompt: str, response=None) -> int:
+    """Record the prompt size of an LLM call, preferring Gemini's reported usage over an estimate."""
+    count = None
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        count = getattr(usage, "prompt_token_count", None)
+    if not count:
+        count = estimate_tokens(prompt)
+    prompt_tokens.observe(count, call)
+    return count
+
+def render_prometheus() -> str:
+    lines = []
+    for histogram in (stage_seconds, prompt_tokens, first_token_seconds, request_seconds):
+        lines.extend(histogram.render())
+    for prefix, collect in _gauge_collectors:
+        try:
+            values = collect()
+        except Exception:
+            continue
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {value}")
+    return "\n".join(lines) + "\n"
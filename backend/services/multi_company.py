@@ -0,0 +1,155 @@
+"""Cross-company retrieval over a shared, sharded FAISS index.
+
+Per-company indexes are merged into `num_shards` flat shards. A company's vectors
+always land in the same shard, stored contiguously, so a company filter becomes an
+ID range selector inside that shard and shards without any requested company are
+skipped. Shards are searched in parallel (FAISS releases the GIL) and the per-shard
+top-k lists are merged by distance.
+"""
+import os
+import glob
+import json
+import zlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+from backend.services.embeddings import INDEX_DIR, encode_texts, get_embedder, index_path_for, load_vector_store
+
+load_dotenv()
+
+SHARED_INDEX_DIR = os.getenv("SHARED_INDEX_DIR", os.path.join(INDEX_DIR, "_shared"))
+SHARED_INDEX_SHARDS = int(os.getenv("SHARED_INDEX_SHARDS", os.cpu_count() or 4))
+INDEX_SUFFIX = "_faiss_index"
+# One pool for every SharedIndex, so rebuilding the index does not leave threads behind
+_shard_pool = ThreadPoolExecutor(max_workers=max(1, SHARED_INDEX_SHARDS), thread_name_prefix="shard")
+
+def shard_for(company: str, num_shards: int) -> int:
+    return zlib.crc32(company.encode("utf-8")) % num_shards
+
+def list_indexed_companies(index_dir: str = INDEX_DIR) -> list:
+    paths = glob.glob(os.path.join(index_dir, f"*{INDEX_SUFFIX}"))
+    return sorted(os.path.basename(p)[:-len(INDEX_SUFFIX)].replace("_", " ") for p in paths)
+
+def stored_vectors(vectorstore) -> np.ndarray:
+    """Vectors of a loaded store in index order, re-embedding (via the cache) when they cannot be reconstructed."""
+    index = vectorstore.index
+    try:
+        try:
+            faiss.extract_index_ivf(index).make_direct_map()
+        except RuntimeError:
+            pass
+        if not isinstance(faiss.downcast_index(index), faiss.IndexIVFPQ):
+            return index.reconstruct_n(0, index.ntotal)
+    except RuntimeError:
+        pass
+    docs = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(index.ntotal)]
+    return encode_texts([doc.page_content for doc in docs])
+
+def build_shared_index(companies: list = None, num_shards: int = None, index_dir: str = INDEX_DIR, shared_dir: str = SHARED_INDEX_DIR) -> dict:
+    companies = companies or list_indexed_companies(index_dir)
+    num_shards = max(1, min(num_shards or SHARED_INDEX_SHARDS, len(companies) or 1))
+    shards = [{"vectors": [], "docs": [], "ranges": {}} for _ in range(num_shards)]
+
+    for company in companies:
+        if not os.path.exists(os.path.join(index_path_for(company, index_dir), "index.faiss")):
+            print(f"[WARN] No index for {company}, skipping")
+            continue
+        vectorstore = load_vector_store(company, index_dir)
+        vectors = stored_vectors(vectorstore)
+        shard = shards[shard_for(company, num_shards)]
+        start = sum(len(v) for v in shard["vectors"])
+        shard["ranges"][company] = [start, start + len(vectors)]
+        shard["vectors"].append(vectors)
+        for position in range(len(vectors)):
+            doc_id = vectorstore.index_to_docstore_id[position]
+            doc = vectorstore.docstore.search(doc_id)
+            shard["docs"].append({
+                "id": doc_id,
+                "company": company,
+                "question": doc.metadata.get("question"),
+                "qid": doc.metadata.get("qid"),
+                "text": doc.page_content,
+            })
+
+    filled = [shard["vectors"][0] for shard in shards if shard["vectors"]]
+    if not filled:
+        raise ValueError("No company indexes found to combine")
+    dim = filled[0].shape[1]
+
+    os.makedirs(shared_dir, exist_ok=True)
+    total = 0
+    for number, shard in enumerate(shards):
+        shard_dir = os.path.join(shared_dir, f"shard_{number}")
+        os.makedirs(shard_dir, exist_ok=True)
+        index = faiss.IndexFlatL2(dim)
+        if shard["vectors"]:
+            index.add(np.ascontiguousarray(np.vstack(shard["vectors"]), dtype=np.float32))
+        faiss.write_index(index, os.path.join(shard_dir, "index.faiss"))
+        with open(os.path.join(shard_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"ranges": shard["ranges"], "docs": shard["docs"]}, f, ensure_ascii=False)
+        total += index.ntotal
+    with open(os.path.join(shared_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"num_shards": num_shards, "companies": companies}, f)
+
+    print(f"Shared index: {total} vectors from {len(companies)} companies in {num_shards} shards at {shared_dir}")
+    return {"shared_dir": shared_dir, "num_shards": num_shards, "companies": len(companies), "vectors": total}
+
+class SharedIndex:
+    def __init__(self, shared_dir: str = SHARED_INDEX_DIR):
+        with open(os.path.join(shared_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.shards = []
+        for number in range(self.manifest["num_shards"]):
+            shard_dir = os.path.join(shared_dir, f"shard_{number}")
+            with open(os.path.join(shard_dir, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.shards.append((faiss.read_index(os.path.join(shard_dir, "index.faiss")), meta))
+
+    def _search_shard(self, shard, query: np.ndarray, k: int, companies: set):
+        index, meta = shard
+        params = None
+        if companies is not None:
+            ranges = [meta["ranges"][c] for c in companies if c in meta["ranges"]]
+            if not ranges:
+                return []
+            if len(ranges) == 1:
+                selector = faiss.IDSelectorRange(*ranges[0])
+            else:
+                selector = faiss.IDSelectorBatch(np.concatenate([np.arange(s, e, dtype=np.int64) for s, e in ranges]))
+            params = faiss.SearchParameters(sel=selector)
+        if index.ntotal == 0:
+            return []
+        distances, positions = index.search(query, k, params=params)
+        return [(float(d), meta["docs"][p]) for d, p in zip(distances[0], positions[0]) if p != -1]
+
+    def search(self, query: str, k: int = 10, companies: list = None) -> list:
+        query_vector = np.asarray([get_embedder().embed_query(query)], dtype=np.float32)
+        wanted = set(companies) if companies else None
+        shard_hits = _shard_pool.map(lambda shard: self._search_shard(shard, query_vector, k, wanted), self.shards)
+        merged = sorted((hit for hits in shard_hits for hit in hits), key=lambda hit: hit[0])[:k]
+        return [{**doc, "distance": distance} for distance, doc in merged]
+
+_shared_index = None
+_shared_lock = threading.Lock()
+
+def get_shared_index(shared_dir: str = SHARED_INDEX_DIR) -> SharedIndex:
+    global _shared_index
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = SharedIndex(shared_dir)
+        return _shared_index
+
+def reset_shared_index():
+    global _shared_index
+    with _shared_lock:
+        _shared_index = None
+
+def search_companies(query: str, k: int = 10, companies: list = None) -> dict:
+    """Top-k chunks across companies plus the best hit per company, best first."""
+    hits = get_shared_index().search(query, k, companies)
+    by_company = {}
+    for hit in hits:
+        by_company.setdefault(hit["company"], hit["distance"])
+    return {"hits": hits, "by_company": [{"company": c, "distance": d} for c, d in by_company.items()]}
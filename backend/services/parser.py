@@ -1,29 +1,58 @@
-import json
 import os
 import re
+from backend.services.dedup import DEDUP_ENABLED, Deduplicator
+from backend.services.storage import iter_scrape
+from backend.services.metrics import span
 
-def load_search_results(filepath: str, top_k: int = 3):
-    with open(filepath, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def clean_question(question: str) -> str:
+    return question.strip("* ").strip()
 
+def parse_question_results(question: str, results: list, question_id: int, top_k: int = 3) -> dict:
+    combined_content = ""
+    for item in results[:top_k]:
+        title = item.get("title", "")
+        content = item.get("content", "")
+        url = item.get("url", "")
+        # Clean up excessive whitespace or markdown
+        content = re.sub(r'\n+', '\n', content.strip())
+        combined_content += f"### {title}\n{content}\n(Source: {url})\n\n"
+
+    return {
+        "question": clean_question(question),
+        "content": combined_content,
+        "metadata": {
+            "question_id": question_id
+        }
+    }
+
+def load_search_results(filepath: str, top_k: int = 3, dedupe: bool = DEDUP_ENABLED):
+    with span("parse"):
+        return _load_search_results(filepath, top_k, dedupe)
+
+def _load_search_results(filepath: str, top_k: int, dedupe: bool):
+    """Parse a scrape into one document per question.
+
+    With `dedupe`, a result already returned for an earlier question is kept only
+    there; that document's metadata lists the later questions under "also_relevant_to".
+    """
+    dedup = Deduplicator() if dedupe else None
     parsed_docs = []
+    by_question = {}
+
+    for idx, (question, results) in enumerate(iter_scrape(filepath)):
+        results = results[:top_k]
+        if dedup is not None:
+            owners = [(item, dedup.check(question, item)) for item in results]
+            results = [item for item, owner in owners if owner is None]
+            for owner in dict.fromkeys(owner for _, owner in owners if owner not in (None, question)):
+                related = by_question[owner]["metadata"].setdefault("also_relevant_to", [])
+                related.append(clean_question(question))
+        doc = parse_question_results(question, results, idx + 1, top_k)
+        by_question[question] = doc
+        parsed_docs.append(doc)
 
-    for idx, (question, results) in enumerate(data.items()):
-        combined_content = ""
-        for item in results[:top_k]:
-            title = item.get("title", "")
-            content = item.get("content", "")
-            url = item.get("url", "")
-            # Clean up excessive whitespace or markdown
-            content = re.sub(r'\n+', '\n', content.strip())
-            combined_content += f"### {title}\n{content}\n(Source: {url})\n\n"
-
-        parsed_docs.append({
-            "question": question.strip("* ").strip(),
-            "content": combined_content,
-            "metadata": {
-                "question_id": idx + 1
-            }
-        })
-
-    return parsed_docs
\ No newline at end of file
+    if dedup is not None and dedup.dropped:
+        stats = dedup.stats()
+        print(f"[INFO] Dedup: dropped {stats['duplicates_dropped']} duplicate results "
+              f"(~{stats['chunks_saved']} chunks, ~{stats['tokens_saved']} tokens saved)")
+    return parsed_docs
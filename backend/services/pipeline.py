@@ -0,0 +1,134 @@
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from backend.services.query_generator import generate_query_list
+from backend.services.bulk_search import BULK_SEARCH_CONCURRENCY, save_search_results, search_question
+from backend.services.parser import clean_question, parse_question_results
+from backend.services.dedup import DEDUP_ENABLED, Deduplicator
+from backend.services.embeddings import EMBEDDING_MODEL_NAME, encode_texts, get_embedder
+from backend.services.rag_pipeline import (
+    FAISS_INDEX_TYPE,
+    build_vectorstore,
+    chunk_documents,
+    save_vectorstore,
+    unique_chunks,
+)
+
+def _embed_worker(jobs: queue.Queue, chunks: dict, vectors: dict, errors: list, model_name: str):
+    # Embeds each question's chunks as soon as they are queued, while other searches are still running
+    while True:
+        documents = jobs.get()
+        if documents is None:
+            return
+        try:
+            batch = {doc_id: doc for doc_id, doc in unique_chunks(documents).items() if doc_id not in chunks}
+            if batch:
+                encoded = encode_texts([doc.page_content for doc in batch.values()], model_name=model_name)
+                for (doc_id, doc), vector in zip(batch.items(), encoded):
+                    chunks[doc_id] = doc
+                    vectors[doc_id] = vector
+        except Exception as e:
+            errors.append(e)
+
+def run_pipeline(
+    company: str,
+    questions: list = None,
+    strategy: str = None,
+    index_type: str = None,
+    max_workers: int = None,
+    save_dir="data/scraped_content",
+    index_dir="embeddings/faiss_index/",
+    embedding_model_name=EMBEDDING_MODEL_NAME,
+    progress_callback=None,
+    dedupe: bool = DEDUP_ENABLED,
+    top_k: int = 3,
+) -> dict:
+    """Generate questions, search, parse, chunk, embed and index in one overlapped pass.
+
+    Each question's results are parsed, chunked and handed to a background embedding
+    thread as soon as its search returns, so the index is ready shortly after the last
+    search instead of after a separate serial rebuild. Writes the same kind of scrape
+    file and index as /search-all/ followed by /build-rag/, but with dedup on, a
+    duplicate is kept by whichever question's search finished first, so chunk IDs and
+    `also_relevant_to` can differ from that path and between runs.
+    `progress_callback(stage, done, total)` is called per searched question and once
+    the index is saved.
+    """
+    start = time.perf_counter()
+    questions = questions or generate_query_list(company)
+    max_workers = max_workers or BULK_SEARCH_CONCURRENCY
+
+    jobs = queue.Queue()
+    chunks, vectors, errors = {}, {}, []
+    embedder_thread = threading.Thread(
+        target=_embed_worker, args=(jobs, chunks, vectors, errors, embedding_model_name), daemon=True
+    )
+    embedder_thread.start()
+
+    results = {}
+    parsed_by_question = {}
+    dedup = Deduplicator() if dedupe else None
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(questions))))
+    try:
+        futures = {
+            pool.submit(search_question, idx, question, strategy): (idx, question)
+            for idx, question in enumerate(questions, 1)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            idx, question = futures[future]
+            results[question] = future.result()
+            kept = results[question][:top_k]
+            if dedup is not None:
+                # Questions finish in arbitrary order; whichever returns a page first keeps it
+                owners = [(item, dedup.check(question, item)) for item in kept]
+                kept = [item for item, owner in owners if owner is None]
+                for owner in dict.fromkeys(owner for _, owner in owners if owner not in (None, question)):
+                    # Shared with the owner's already-queued chunks, so this lands in their metadata
+                    parsed_by_question[owner]["metadata"]["also_relevant_to"].append(clean_question(question))
+            parsed = parse_question_results(question, kept, idx, top_k)
+            parsed["metadata"]["also_relevant_to"] = []
+            parsed_by_question[question] = parsed
+            jobs.put(chunk_documents(company, [parsed]))
+            if progress_callback:
+                progress_callback("questions searched", done, len(questions))
+    finally:
+        jobs.put(None)
+        pool.shutdown(wait=True, cancel_futures=True)
+        embedder_thread.join()
+    search_done = time.perf_counter()
+
+    if errors:
+        raise errors[0]
+    if dedup is not None and dedup.dropped:
+        stats = dedup.stats()
+        print(f"[INFO] Dedup: dropped {stats['duplicates_dropped']} duplicate results "
+              f"(~{stats['chunks_saved']} chunks, ~{stats['tokens_saved']} tokens saved)")
+    if not chunks:
+        raise ValueError(f"No content to index for {company}")
+
+    # Keep question order in the saved file, as bulk_search_questions does
+    filepath = save_search_results(company, {q: results[q] for q in questions if q in results}, save_dir)
+
+    ids = list(chunks)
+    matrix = np.ascontiguousarray(np.vstack([vectors[doc_id] for doc_id in ids]), dtype=np.float32)
+    vectorstore = build_vectorstore(
+        [chunks[doc_id] for doc_id in ids], matrix, get_embedder(embedding_model_name), ids, index_type or FAISS_INDEX_TYPE
+    )
+    index_path = save_vectorstore(vectorstore, company, index_dir)
+    if progress_callback:
+        progress_callback("chunks embedded", len(ids), len(ids))
+
+    end = time.perf_counter()
+    print(f"[INFO] Pipeline for {company}: {len(questions)} questions, {len(ids)} chunks in {end - start:.1f}s "
+          f"(index ready {end - search_done:.1f}s after the last search)")
+    return {
+        "company": company,
+        "questions": questions,
+        "filepath": filepath,
+        "index_path": index_path,
+        "chunks": len(ids),
+        "seconds": round(end - start, 2),
+        "index_lag_seconds": round(end - search_done, 2),
+    }
@@ -0,0 +1,186 @@
+"""Health tracking and circuit breakers for the search providers.
+
+Every provider call reports its outcome and latency here. A provider whose recent
+error rate crosses the threshold, or that answers 401/403/429 (bad key, quota
+exhausted), is skipped for a cooldown; after it a single probe call decides
+whether it closes again or stays open for twice as long. Healthy providers are
+ordered by expected time to a useful answer: a call that returns no results is
+not an error for the breaker, but it does not count as useful either.
+"""
+import os
+import threading
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROVIDER_HEALTH_WINDOW = int(os.getenv("PROVIDER_HEALTH_WINDOW", 20))
+PROVIDER_ERROR_THRESHOLD = float(os.getenv("PROVIDER_ERROR_THRESHOLD", 0.5))
+PROVIDER_MIN_CALLS = int(os.getenv("PROVIDER_MIN_CALLS", 5))
+PROVIDER_COOLDOWN = float(os.getenv("PROVIDER_COOLDOWN", 30))
+PROVIDER_MAX_COOLDOWN = float(os.getenv("PROVIDER_MAX_COOLDOWN", 600))
+PROVIDER_ADAPTIVE_ORDER = os.getenv("PROVIDER_ADAPTIVE_ORDER", "1") != "0"
+LATENCY_EWMA_ALPHA = 0.3
+# Assumed latency for a provider with no calls yet, so it keeps its configured place
+PRIOR_LATENCY = 1.0
+# Statuses that mean every further call will fail too until something changes
+TRIP_STATUSES = (401, 403, 429)
+
+CLOSED, OPEN, HALF_OPEN, UNCONFIGURED = "closed", "open", "half_open", "unconfigured"
+
+def _status_code(error) -> int:
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+def _retry_after(error) -> float:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("Retry-After", 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+class ProviderHealth:
+    def __init__(self, name: str, configured: bool = True):
+        self.name = name
+        self.configured = configured
+        self.outcomes = deque(maxlen=PROVIDER_HEALTH_WINDOW)
+        # True when a call returned results; failed and empty calls are both False
+        self.useful = deque(maxlen=PROVIDER_HEALTH_WINDOW)
+        self.latency_ewma = None
+        self.state = CLOSED if configured else UNCONFIGURED
+        self.opened_at = 0.0
+        self.cooldown = PROVIDER_COOLDOWN
+        self.probe_started = None
+        self.calls = 0
+        self.failures = 0
+        self.last_error = None
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def useful_rate(self) -> float:
+        return self.useful.count(True) / len(self.useful) if self.useful else 1.0
+
+    def expected_seconds(self) -> float:
+        """Mean latency divided by the useful-answer rate: the expected wait for results."""
+        latency = self.latency_ewma if self.latency_ewma is not None else PRIOR_LATENCY
+        return latency / max(self.useful_rate(), 0.05)
+
+class ProviderHealthRegistry:
+    def __init__(self):
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, configured: bool = True):
+        with self._lock:
+            self._providers[name] = ProviderHealth(name, configured)
+
+    def _get(self, name: str) -> ProviderHealth:
+        if name not in self._providers:
+            self._providers[name] = ProviderHealth(name)
+        return self._providers[name]
+
+    def _open(self, health: ProviderHealth, now: float, cooldown: float):
+        health.state = OPEN
+        health.opened_at = now
+        health.cooldown = min(max(cooldown, PROVIDER_COOLDOWN), PROVIDER_MAX_COOLDOWN)
+        health.probe_started = None
+        print(f"[WARN] Circuit open for {health.name} for {health.cooldown:.0f}s: {health.last_error}")
+
+    def _allow(self, health: ProviderHealth, now: float) -> bool:
+        if health.state == CLOSED:
+            return True
+        if health.state == OPEN and now - health.opened_at >= health.cooldown:
+            health.state = HALF_OPEN
+        if health.state == HALF_OPEN:
+            # One probe at a time; a probe that never reported back (e.g. a cancelled
+            # hedge) frees the slot after a cooldown
+            if health.probe_started is None or now - health.probe_started >= health.cooldown:
+                health.probe_started = now
+                return True
+        return False
+
+    def record(self, name: str, seconds: float, error: Exception = None, empty: bool = False):
+        """Report one real provider call; `empty` marks a call that succeeded with no results."""
+        now = time.monotonic()
+        with self._lock:
+            health = self._get(name)
+            health.calls += 1
+            health.outcomes.append(error is None)
+            health.useful.append(error is None and not empty)
+            if health.latency_ewma is None:
+                health.latency_ewma = seconds
+            else:
+                health.latency_ewma += LATENCY_EWMA_ALPHA * (seconds - health.latency_ewma)
+
+            if error is None:
+                if health.state == HALF_OPEN:
+                    print(f"[INFO] Circuit closed for {name}")
+                    health.outcomes.clear()
+                    health.outcomes.append(True)
+                    health.cooldown = PROVIDER_COOLDOWN
+                if health.configured:
+                    health.state = CLOSED
+                health.probe_started = None
+                return
+
+            health.failures += 1
+            health.last_error = str(error)[:200]
+            if health.state == HALF_OPEN:
+                self._open(health, now, health.cooldown * 2)
+            elif health.state == CLOSED:
+                if _status_code(error) in TRIP_STATUSES:
+                    self._open(health, now, _retry_after(error))
+                elif len(health.outcomes) >= PROVIDER_MIN_CALLS and health.error_rate() >= PROVIDER_ERROR_THRESHOLD:
+                    self._open(health, now, PROVIDER_COOLDOWN)
+
+    def order(self, names: list, adaptive: bool = PROVIDER_ADAPTIVE_ORDER) -> list:
+        """Return the providers worth calling now, best first.
+
+        Unconfigured providers are dropped and open circuits skipped; a provider due
+        for its half-open probe goes first. If every configured circuit is open the
+        configured order is returned, so a search is never refused outright.
+        """
+        now = time.monotonic()
+        with self._lock:
+            configured = [health for health in map(self._get, names) if health.configured]
+            allowed = [health for health in configured if self._allow(health, now)]
+            if not allowed:
+                return [health.name for health in configured]
+            if adaptive:
+                allowed.sort(key=lambda health: (health.state != HALF_OPEN, health.expected_seconds()))
+            return [health.name for health in allowed]
+
+    def reset(self, name: str = None):
+        with self._lock:
+            for health in list(self._providers.values()):
+                if name is None or health.name == name:
+                    self._providers[health.name] = ProviderHealth(health.name, health.configured)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                health.name: {
+                    "state": health.state,
+                    "configured": health.configured,
+                    "calls": health.calls,
+                    "failures": health.failures,
+                    "error_rate": round(health.error_rate(), 3),
+                    "useful_rate": round(health.useful_rate(), 3),
+                    "latency_ewma_ms": round(health.latency_ewma * 1000, 1) if health.latency_ewma is not None else None,
+                    "expected_ms": round(health.expected_seconds() * 1000, 1),
+                    "cooldown_remaining_s": round(max(0.0, health.opened_at + health.cooldown - now), 1) if health.state == OPEN else 0.0,
+                    "last_error": health.last_error,
+                }
+                for health in self._providers.values()
+            }
+
+    def stats(self) -> dict:
+        """Circuit counts by state, for the /metrics gauges."""
+        with self._lock:
+            states = [health.state for health in self._providers.values()]
+        return {"open": states.count(OPEN), "half_open": states.count(HALF_OPEN), "closed": states.count(CLOSED)}
+
+provider_health = ProviderHealthRegistry()
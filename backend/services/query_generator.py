@@ -1,5 +1,6 @@
 import google.generativeai as genai
 from dotenv import load_dotenv
+from backend.services.metrics import record_prompt_tokens, span
 import os
 
 load_dotenv()
@@ -39,6 +40,8 @@ def generate_query_list(company_name: str) -> list:
     """
 
 
-    response = model.generate_content(prompt)
+    with span("llm", "generate_queries"):
+        response = model.generate_content(prompt)
+    record_prompt_tokens("generate_queries", prompt, response)
     questions = response.text.strip().split("\n")
     return [q.strip() for q in questions if q.strip()]
\ No newline at end of file
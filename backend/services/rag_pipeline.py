@@ -1,25 +1,29 @@
 import os
-import uuid
+import hashlib
 from typing import List
-from sentence_transformers import SentenceTransformer
+import faiss
+import numpy as np
 from langchain.vectorstores import FAISS
 from langchain.docstore.document import Document
-from langchain.embeddings import HuggingFaceEmbeddings
+from langchain.docstore.in_memory import InMemoryDocstore
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from backend.services.parser import load_search_results
+from backend.services.bm25 import BM25Index
+from backend.services.answer_cache import answer_cache
+from backend.services.metrics import span
+from backend.services.embeddings import (
+    EMBEDDING_MODEL_NAME,
+    encode_texts,
+    get_embedder,
+    index_path_for,
+    vector_store_cache,
+)
 
-def build_faiss_index(
-    company: str,
-    filepath: str,
-    save_dir="embeddings/faiss_index/",
-    chunk_size=500,
-    chunk_overlap=50,
-    embedding_model_name="sentence-transformers/all-MiniLM-L6-v2"
-):
-    # Step 1: Load parsed docs
-    parsed_docs = load_search_results(filepath)
-    
-    # Step 2: Chunk each content block
+def chunk_documents(company: str, parsed_docs: list, chunk_size=500, chunk_overlap=50) -> List[Document]:
+    with span("chunk"):
+        return _chunk_documents(company, parsed_docs, chunk_size, chunk_overlap)
+
+def _chunk_documents(company: str, parsed_docs: list, chunk_size: int, chunk_overlap: int) -> List[Document]:
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap
@@ -34,22 +38,191 @@ def build_faiss_index(
                 metadata={
                     "company": company,
                     "question": doc["question"],
-                    "qid": doc["metadata"]["question_id"]
+                    "qid": doc["metadata"]["question_id"],
+                    # Questions whose duplicate results were folded into this one (see dedup)
+                    "also_relevant_to": doc["metadata"].get("also_relevant_to", [])
                 }
             ))
+    return documents
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+# Training rows per IVF centroid, as recommended by FAISS' k-means
+TRAIN_POINTS_PER_CENTROID = 39
+PQ_TRAIN_MIN = 256
+
+def resolve_index_type(n: int, d: int, index_type: str, pq_m: int = 16, warn: bool = False) -> str:
+    """The index type create_faiss_index actually builds for `n` vectors of dim `d`."""
+    if index_type == "ivf_pq" and (n < PQ_TRAIN_MIN or d % pq_m):
+        if warn:
+            print(f"[WARN] {n} vectors of dim {d} cannot train PQ{pq_m}, falling back to ivf_flat")
+        index_type = "ivf_flat"
+    if index_type.startswith("ivf_") and n < TRAIN_POINTS_PER_CENTROID * 2:
+        if warn:
+            print(f"[WARN] {n} vectors are too few to train {index_type}, falling back to flat")
+        index_type = "flat"
+    return index_type
+
+def create_faiss_index(
+    vectors: np.ndarray,
+    index_type: str = "flat",
+    nlist: int = None,
+    pq_m: int = 16,
+    hnsw_m: int = 32,
+    max_train_points: int = 100_000,
+    seed: int = 0,
+):
+    """Create and train (but not fill) a FAISS index of the requested type for `vectors`."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+    n, d = vectors.shape
+    nlist = nlist or max(1, min(int(4 * np.sqrt(n)), n // TRAIN_POINTS_PER_CENTROID))
+
+    index_type = resolve_index_type(n, d, index_type, pq_m, warn=True)
+    if index_type == "flat":
+        return faiss.IndexFlatL2(d)
+    if index_type == "hnsw":
+        return faiss.index_factory(d, f"HNSW{hnsw_m}")
+
+    factory = f"IVF{nlist},Flat" if index_type == "ivf_flat" else f"IVF{nlist},PQ{pq_m}"
+    index = faiss.index_factory(d, factory)
+    # Train on a random sample; k-means gains little beyond a few hundred points per centroid
+    sample_size = min(n, max_train_points)
+    rng = np.random.default_rng(seed)
+    sample = vectors if sample_size == n else vectors[rng.choice(n, sample_size, replace=False)]
+    index.train(np.ascontiguousarray(sample, dtype=np.float32))
+    return index
+
+def chunk_id(document: Document) -> str:
+    """Content-addressed docstore ID, stable across rebuilds of the same chunk."""
+    key = "\x1f".join([document.metadata["company"], document.metadata["question"], document.page_content])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def unique_chunks(documents: List[Document]) -> dict:
+    chunks = {}
+    for doc in documents:
+        chunks.setdefault(chunk_id(doc), doc)
+    return chunks
+
+def add_vectors(vectorstore: FAISS, documents: List[Document], vectors: np.ndarray, ids: List[str]):
+    # Write the float32 matrix straight into FAISS instead of round-tripping through lists
+    start = vectorstore.index.ntotal
+    with span("faiss_add"):
+        vectorstore.index.add(vectors)
+    vectorstore.docstore.add(dict(zip(ids, documents)))
+    vectorstore.index_to_docstore_id.update({start + i: doc_id for i, doc_id in enumerate(ids)})
 
+def build_vectorstore(documents: List[Document], vectors: np.ndarray, embedder, ids: List[str], index_type: str = "flat", **index_kwargs) -> FAISS:
+    index = create_faiss_index(vectors, index_type, **index_kwargs)
+    vectorstore = FAISS(embedder, index, InMemoryDocstore({}), {})
+    add_vectors(vectorstore, documents, vectors, ids)
+    return vectorstore
+
+def index_type_of(index) -> str:
+    """The INDEX_TYPES name of a loaded FAISS index."""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return "flat"
+    return "ivf_pq" if isinstance(ivf, faiss.IndexIVFPQ) else "ivf_flat"
+
+def update_vectorstore(vectorstore: FAISS, chunks: dict, embed) -> dict:
+    """Bring a loaded store in line with `chunks`: embed only new IDs, drop stale ones.
+
+    Returns None if stale vectors cannot be removed in place, so the caller rebuilds.
+    Only flat indexes qualify: LangChain's delete renumbers positions after removal,
+    which matches IndexFlat's compaction but not IVF (explicit IDs) or HNSW (no removal).
+    """
+    existing = set(vectorstore.index_to_docstore_id.values())
+    stale = [doc_id for doc_id in existing if doc_id not in chunks]
+    new_ids = [doc_id for doc_id in chunks if doc_id not in existing]
+
+    if stale:
+        if not isinstance(vectorstore.index, faiss.IndexFlat):
+            print(f"[INFO] {index_type_of(vectorstore.index)} index cannot drop {len(stale)} stale vectors in place, rebuilding")
+            return None
+        vectorstore.delete(stale)
+    # Reused chunks keep their vectors but take fresh metadata (e.g. a shifted qid)
+    vectorstore.docstore._dict.update({doc_id: chunks[doc_id] for doc_id in existing if doc_id in chunks})
+    if new_ids:
+        new_docs = [chunks[doc_id] for doc_id in new_ids]
+        add_vectors(vectorstore, new_docs, embed([doc.page_content for doc in new_docs]), new_ids)
+    return {"reused": len(existing) - len(stale), "added": len(new_ids), "removed": len(stale)}
+
+def build_faiss_index(
+    company: str,
+    filepath: str,
+    save_dir="embeddings/faiss_index/",
+    chunk_size=500,
+    chunk_overlap=50,
+    embedding_model_name=EMBEDDING_MODEL_NAME,
+    batch_size: int = None,
+    workers: int = None,
+    progress_callback=None,
+    incremental: bool = False,
+    index_type: str = None
+):
+    # Step 1: Load parsed docs
+    parsed_docs = load_search_results(filepath)
+
+    # Step 2: Chunk each content block
+    documents = chunk_documents(company, parsed_docs, chunk_size, chunk_overlap)
     print(f"Total Chunks Created: {len(documents)}")
+    if not documents:
+        raise ValueError(f"No content to index in {filepath}")
+
+    chunks = unique_chunks(documents)
+    requested_type = index_type
+    index_type = index_type or FAISS_INDEX_TYPE
+    embedder = get_embedder(embedding_model_name)
+    index_path = index_path_for(company, save_dir)
+
+    def embed(texts):
+        return encode_texts(
+            texts,
+            model_name=embedding_model_name,
+            batch_size=batch_size,
+            workers=workers,
+            progress_callback=progress_callback,
+        )
 
-    # Step 3: Embed chunks
-    embedder = HuggingFaceEmbeddings(model_name=embedding_model_name)
+    vectorstore = None
+    if incremental and os.path.exists(os.path.join(index_path, "index.faiss")):
+        # Step 3/4: Reuse stored vectors, embedding only new or changed chunks
+        vectorstore = FAISS.load_local(index_path, embedder, allow_dangerous_deserialization=True)
+        # Rebuilds keep the stored index's type unless another one was asked for. Compare
+        # against what the request would build for this corpus, so an IVF request that
+        # fell back to flat on a small corpus still updates in place.
+        stored_type = index_type_of(vectorstore.index)
+        index_type = requested_type or stored_type
+        effective_type = resolve_index_type(len(chunks), vectorstore.index.d, index_type)
+        changes = update_vectorstore(vectorstore, chunks, embed) if effective_type == stored_type else None
+        if changes is None:
+            vectorstore = None
+        else:
+            print(f"[INFO] Incremental build: {changes['reused']} reused, {changes['added']} added, {changes['removed']} removed")
 
-    # Step 4: Build FAISS index
-    vectorstore = FAISS.from_documents(documents, embedder)
+    if vectorstore is None:
+        # Step 3: Embed chunks
+        vectors = embed([doc.page_content for doc in chunks.values()])
+
+        # Step 4: Build FAISS index
+        vectorstore = build_vectorstore(list(chunks.values()), vectors, embedder, list(chunks), index_type)
 
     # Step 5: Save index
+    return save_vectorstore(vectorstore, company, save_dir)
+
+def save_vectorstore(vectorstore: FAISS, company: str, save_dir="embeddings/faiss_index/") -> str:
     os.makedirs(save_dir, exist_ok=True)
-    index_path = os.path.join(save_dir, f"{company.replace(' ', '_')}_faiss_index")
+    index_path = index_path_for(company, save_dir)
     vectorstore.save_local(index_path)
+    # Rebuilt from the final docstore so incremental updates stay in sync
+    doc_ids = list(vectorstore.index_to_docstore_id.values())
+    BM25Index.build(doc_ids, [vectorstore.docstore.search(doc_id).page_content for doc_id in doc_ids]).save(index_path)
+    vector_store_cache.invalidate(index_path)
+    answer_cache.invalidate(company)
 
     print(f"FAISS index saved to: {index_path}")
-    return index_path
\ No newline at end of file
+    return index_path
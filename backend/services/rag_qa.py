@@ -1,22 +1,79 @@
 import os
-from langchain.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 from google.generativeai import GenerativeModel
 from dotenv import load_dotenv
+from backend.services.bm25 import reciprocal_rank_fusion
+from backend.services.metrics import first_token_seconds, record_prompt_tokens, span
+from backend.services.context_packer import CONTEXT_CANDIDATE_FACTOR, CONTEXT_PACKING, pack_context
+from backend.services.answer_cache import ANSWER_CACHE_ENABLED, answer_cache, index_version
+from backend.services.embeddings import INDEX_DIR, apply_search_params, get_embedder, index_path_for, load_vector_store
 
 load_dotenv()
 model = GenerativeModel("models/gemini-2.0-flash")
 
-def answer_with_rag(company: str, question: str, index_dir="embeddings/faiss_index", k: int = 5) -> str:
-    index_path = os.path.join(index_dir, f"{company.replace(' ', '_')}_faiss_index")
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vectorstore = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") != "0"
+# Candidates taken from each retriever before fusion
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", 20))
+# Concurrent Gemini calls for batch QA
+QA_BATCH_CONCURRENCY = int(os.getenv("QA_BATCH_CONCURRENCY", 8))
 
-    docs = vectorstore.similarity_search(question, k=k)
-    context = "\n\n".join([doc.page_content for doc in docs])
+def vector_search(vectorstore, query_vectors: np.ndarray, k: int) -> list:
+    """One FAISS search for a batch of query vectors; returns a list of docstore-ID lists."""
+    with span("faiss_search"):
+        _, positions = vectorstore.index.search(np.ascontiguousarray(query_vectors, dtype=np.float32), k)
+    return [[vectorstore.index_to_docstore_id[p] for p in row if p != -1] for row in positions]
 
+def fuse_hits(vectorstore, question: str, vector_ids: list, k: int, hybrid: bool = HYBRID_SEARCH) -> list:
+    """Combine vector hits with BM25 hits by reciprocal rank; returns (Document, score) pairs."""
+    bm25 = getattr(vectorstore, "bm25", None)
+    if hybrid and bm25 is not None:
+        keyword_ids = [doc_id for doc_id, _ in bm25.search(question, len(vector_ids) or k)]
+        ranked = reciprocal_rank_fusion([vector_ids, keyword_ids])
+    else:
+        ranked = reciprocal_rank_fusion([vector_ids])
+    return [(vectorstore.docstore.search(doc_id), score) for doc_id, score in ranked[:k]]
 
-    prompt = f"""
+def embed_question(question: str) -> np.ndarray:
+    return np.asarray(get_embedder().embed_query(question), dtype=np.float32)
+
+def retrieve_documents(company: str, question: str, index_dir=INDEX_DIR, k: int = 5, nprobe: int = None, ef_search: int = None, hybrid: bool = HYBRID_SEARCH, query_vector: np.ndarray = None) -> list:
+    vectorstore = load_vector_store(company, index_dir)
+    apply_search_params(vectorstore.index, nprobe, ef_search)
+
+    fetch_k = max(k, HYBRID_FETCH_K) if hybrid else k
+    if query_vector is None:
+        query_vector = embed_question(question)
+    vector_ids = vector_search(vectorstore, query_vector[None, :], fetch_k)[0]
+    return fuse_hits(vectorstore, question, vector_ids, k, hybrid)
+
+def candidate_count(k: int) -> int:
+    return k * CONTEXT_CANDIDATE_FACTOR if CONTEXT_PACKING else k
+
+def build_context(docs: list, k: int) -> str:
+    """Pack up to `k` of the retrieved (Document, score) pairs into the prompt context."""
+    if CONTEXT_PACKING:
+        return pack_context(docs, max_chunks=k)
+    return "\n\n".join([doc.page_content for doc, _ in docs[:k]])
+
+def retrieve_context(company: str, question: str, index_dir=INDEX_DIR, k: int = 5, nprobe: int = None, ef_search: int = None, query_vector: np.ndarray = None) -> str:
+    docs = retrieve_documents(company, question, index_dir, candidate_count(k), nprobe, ef_search, query_vector=query_vector)
+    return build_context(docs, k)
+
+def _cached_answer(company: str, question: str, index_dir: str):
+    """Embed the question and check the semantic answer cache; returns (answer or None, vector, version)."""
+    query_vector = embed_question(question)
+    version = index_version(index_path_for(company, index_dir))
+    match = answer_cache.lookup(company, question, query_vector, version)
+    if match is not None:
+        print(f"[INFO] Answer cache hit ({match[2]:.3f}) for: {question}")
+        return match[0], query_vector, version
+    return None, query_vector, version
+
+def build_rag_prompt(context: str, question: str) -> str:
+    return f"""
 You are a strict and factual company research assistant.
 
 Use only the information provided in the context below to answer the user's question. Do not guess, assume, or fabricate any details. If the context does not contain enough information to answer the question, respond with:
@@ -36,5 +93,115 @@ Question:
 Answer:
 """
 
-    response = model.generate_content(prompt)
-    return response.text.strip()
\ No newline at end of file
+def answer_with_rag(company: str, question: str, index_dir=INDEX_DIR, k: int = 5, nprobe: int = None, ef_search: int = None, use_cache: bool = ANSWER_CACHE_ENABLED) -> str:
+    query_vector = None
+    if use_cache:
+        answer, query_vector, version = _cached_answer(company, question, index_dir)
+        if answer is not None:
+            return answer
+
+    context = retrieve_context(company, question, index_dir, k, nprobe, ef_search, query_vector=query_vector)
+    prompt = build_rag_prompt(context, question)
+
+    with span("llm", "answer"):
+        response = model.generate_content(prompt)
+    record_prompt_tokens("answer", prompt, response)
+    answer = response.text.strip()
+    if use_cache:
+        answer_cache.store(company, question, query_vector, answer, version)
+    return answer
+
+async def stream_answer_with_rag(company: str, question: str, index_dir=INDEX_DIR, k: int = 5, use_cache: bool = ANSWER_CACHE_ENABLED):
+    """Yield the answer as text fragments while Gemini generates it.
+
+    Retrieval runs in a worker thread and generation uses the async client, so the
+    event loop is never blocked while waiting on the model. A cached answer is
+    yielded in one piece.
+    """
+    query_vector = None
+    if use_cache:
+        answer, query_vector, version = await asyncio.to_thread(_cached_answer, company, question, index_dir)
+        if answer is not None:
+            yield answer
+            return
+
+    context = await asyncio.to_thread(retrieve_context, company, question, index_dir, k, query_vector=query_vector)
+    prompt = build_rag_prompt(context, question)
+
+    record_prompt_tokens("answer_stream", prompt)
+    parts = []
+    with span("llm", "answer_stream"):
+        start = time.perf_counter()
+        response = await model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a trailing finish_reason) carry nothing to show
+                continue
+            if text:
+                if not parts:
+                    first_token_seconds.observe(time.perf_counter() - start, "answer_stream")
+                parts.append(text)
+                yield text
+    if use_cache and parts:
+        answer_cache.store(company, question, query_vector, "".join(parts).strip(), version)
+
+def _generate_answer(prompt: str) -> str:
+    with span("llm", "answer_batch"):
+        response = model.generate_content(prompt)
+    record_prompt_tokens("answer_batch", prompt, response)
+    return response.text.strip()
+
+def iter_answer_batch(company: str, questions: list, index_dir=INDEX_DIR, k: int = 5, max_workers: int = None, use_cache: bool = ANSWER_CACHE_ENABLED, hybrid: bool = HYBRID_SEARCH):
+    """Answer many questions against one company, yielding (position, result) as each finishes.
+
+    The index is loaded once, all questions are embedded in one batched forward pass
+    and searched with a single FAISS call; only the LLM calls run per question, with
+    bounded concurrency. Each result is {"question", "answer", "cached"} or {"question", "error"}.
+    """
+    vectorstore = load_vector_store(company, index_dir)
+    apply_search_params(vectorstore.index)
+    query_vectors = np.asarray(get_embedder().embed_documents(list(questions)), dtype=np.float32)
+    version = index_version(index_path_for(company, index_dir))
+
+    pending = []
+    for position, (question, query_vector) in enumerate(zip(questions, query_vectors)):
+        match = answer_cache.lookup(company, question, query_vector, version) if use_cache else None
+        if match is not None:
+            yield position, {"question": question, "answer": match[0], "cached": True}
+        else:
+            pending.append(position)
+    if not pending:
+        return
+
+    candidates = candidate_count(k)
+    fetch_k = max(candidates, HYBRID_FETCH_K) if hybrid else candidates
+    hits = vector_search(vectorstore, query_vectors[pending], fetch_k)
+    prompts = {}
+    for position, vector_ids in zip(pending, hits):
+        docs = fuse_hits(vectorstore, questions[position], vector_ids, candidates, hybrid)
+        context = build_context(docs, k)
+        prompts[position] = build_rag_prompt(context, questions[position])
+
+    max_workers = max_workers or QA_BATCH_CONCURRENCY
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prompts)))) as pool:
+        futures = {pool.submit(_generate_answer, prompt): position for position, prompt in prompts.items()}
+        for future in as_completed(futures):
+            position = futures[future]
+            question = questions[position]
+            try:
+                answer = future.result()
+            except Exception as e:
+                yield position, {"question": question, "error": str(e)}
+                continue
+            if use_cache:
+                answer_cache.store(company, question, query_vectors[position], answer, version)
+            yield position, {"question": question, "answer": answer, "cached": False}
+
+def answer_batch(company: str, questions: list, index_dir=INDEX_DIR, k: int = 5, max_workers: int = None, use_cache: bool = ANSWER_CACHE_ENABLED) -> list:
+    """Answer all questions and return results in question order."""
+    results = [None] * len(questions)
+    for position, result in iter_answer_batch(company, questions, index_dir, k, max_workers, use_cache):
+        results[position] = result
+    return results
@@ -0,0 +1,192 @@
+"""Per-provider rate limits and daily quotas for search calls.
+
+Each provider gets a token bucket refilled at its requests-per-second limit and a
+daily call quota counted in SQLite, so restarts do not forget what was spent.
+When a bucket is empty the call either waits for the next token (policy "wait",
+up to RATE_LIMIT_MAX_WAIT seconds) or is refused at once (policy "route") so
+search_web moves to the next provider instead of collecting a 429.
+Override the limits with e.g. SERPAPI_RPS=1, SERPAPI_BURST=2, SERPAPI_DAILY_QUOTA=250
+(0 means no daily quota).
+"""
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from functools import wraps
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_POLICIES = ("wait", "route")
+RATE_LIMIT_POLICY = os.getenv("RATE_LIMIT_POLICY", "wait")
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", 5.0))
+QUOTA_DB_PATH = os.getenv("QUOTA_DB_PATH", "data/cache/provider_quota.sqlite3")
+
+PROVIDER_LIMITS = {
+    name: {
+        "rps": float(os.getenv(f"{name.upper()}_RPS", rps)),
+        "burst": int(os.getenv(f"{name.upper()}_BURST", burst)),
+        "daily_quota": int(os.getenv(f"{name.upper()}_DAILY_QUOTA", quota)),
+    }
+    # Tavily's burst covers one bulk run of 15 questions without queueing; the
+    # sustained rate stays at 5 requests/s
+    for name, rps, burst, quota in [
+        ("tavily", 5, 15, 0),
+        ("serpapi", 2, 2, 0),
+        ("brave", 1, 1, 0),
+        ("newsapi", 1, 2, 100),
+        ("rapidapi", 3, 3, 0),
+        ("wikipedia", 10, 10, 0),
+    ]
+}
+
+class RateLimited(Exception):
+    """The provider was skipped on purpose: no token within the allowed wait, or quota spent."""
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def reserve(self, max_wait: float):
+        """Take a token, returning how long to wait before using it, or None if that exceeds `max_wait`.
+
+        The token may be borrowed (the balance goes negative) so concurrent callers
+        queue behind each other instead of all waking at the same refill.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+class ProviderRateLimiter:
+    def __init__(self, limits: dict = PROVIDER_LIMITS, path: str = QUOTA_DB_PATH, policy: str = RATE_LIMIT_POLICY, max_wait: float = RATE_LIMIT_MAX_WAIT):
+        if policy not in RATE_LIMIT_POLICIES:
+            raise ValueError(f"Unknown rate limit policy '{policy}', expected one of {RATE_LIMIT_POLICIES}")
+        self.limits = limits
+        self.path = path
+        self.policy = policy
+        self.max_wait = max_wait
+        self._buckets = {name: TokenBucket(limit["rps"], limit["burst"]) for name, limit in limits.items() if limit["rps"] > 0}
+        self._used = {}
+        self._counters = {name: {"calls": 0, "waited": 0, "routed": 0, "wait_seconds": 0.0} for name in limits}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS quota_usage (
+                    provider TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    calls INTEGER NOT NULL,
+                    PRIMARY KEY (provider, day)
+                )"""
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def _today() -> str:
+        # Provider quotas reset on UTC days
+        return datetime.now(timezone.utc).date().isoformat()
+
+    def _used_today(self, name: str) -> int:
+        day = self._today()
+        cached = self._used.get(name)
+        if cached is None or cached[0] != day:
+            row = self._db().execute("SELECT calls FROM quota_usage WHERE provider = ? AND day = ?", (name, day)).fetchone()
+            cached = self._used[name] = (day, row[0] if row else 0)
+        return cached[1]
+
+    def _count_call(self, name: str):
+        day = self._today()
+        db = self._db()
+        db.execute(
+            """INSERT INTO quota_usage (provider, day, calls) VALUES (?, ?, 1)
+               ON CONFLICT(provider, day) DO UPDATE SET calls = calls + 1""",
+            (name, day),
+        )
+        db.commit()
+        self._used[name] = (day, self._used_today(name) + 1)
+
+    def _quota(self, name: str) -> int:
+        return self.limits.get(name, {}).get("daily_quota", 0)
+
+    def has_quota(self, name: str) -> bool:
+        quota = self._quota(name)
+        if not quota:
+            return True
+        with self._lock:
+            return self._used_today(name) < quota
+
+    def acquire(self, name: str, policy: str = None) -> float:
+        """Claim one call for `name`, sleeping if the policy allows; returns seconds waited.
+
+        Raises RateLimited when the call should go to another provider instead.
+        """
+        policy = policy or self.policy
+        with self._lock:
+            counters = self._counters.setdefault(name, {"calls": 0, "waited": 0, "routed": 0, "wait_seconds": 0.0})
+            quota = self._quota(name)
+            if quota and self._used_today(name) >= quota:
+                counters["routed"] += 1
+                raise RateLimited(f"{name} daily quota of {quota} calls is used up")
+            bucket = self._buckets.get(name)
+            wait = bucket.reserve(self.max_wait if policy == "wait" else 0.0) if bucket else 0.0
+            if wait is None:
+                counters["routed"] += 1
+                raise RateLimited(f"{name} is at its limit of {bucket.rate:g} requests/s")
+            counters["calls"] += 1
+            if wait:
+                counters["waited"] += 1
+                counters["wait_seconds"] += wait
+            if quota:
+                self._count_call(name)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    **limit,
+                    **{k: round(v, 3) if isinstance(v, float) else v for k, v in self._counters[name].items()},
+                    "used_today": self._used_today(name) if limit["daily_quota"] else None,
+                }
+                for name, limit in self.limits.items()
+            }
+
+    def gauges(self) -> dict:
+        """Flat per-provider counters for /metrics."""
+        values = {}
+        for name, row in self.stats().items():
+            for key in ("calls", "waited", "routed", "wait_seconds", "used_today"):
+                if row[key] is not None:
+                    values[f"{name}_{key}"] = row[key]
+        return values
+
+rate_limiter = ProviderRateLimiter()
+
+def rate_limited(provider: str):
+    """Take a token from `provider`'s bucket before each real (uncached) call."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if RATE_LIMIT_ENABLED:
+                rate_limiter.acquire(provider)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
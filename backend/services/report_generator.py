@@ -1,8 +1,13 @@
-import json
+import hashlib
 import google.generativeai as genai
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from dotenv import load_dotenv
+from backend.services.dedup import DEDUP_ENABLED, dedupe_scrape
+from backend.services.storage import read_scrape
+from backend.services.tokens import estimate_tokens
+from backend.services.metrics import record_prompt_tokens, span
 load_dotenv()
 
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
@@ -10,15 +15,13 @@ genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 # Correct usage: model_name instead of model
 model = genai.GenerativeModel(model_name="gemini-2.0-flash")
 
-def load_json(filepath: str):
-    with open(filepath, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def create_report_from_json(filepath: str) -> str:
-    data = load_json(filepath)
-
+REPORT_MODES = ("single", "map_reduce")
+# Questions per section summary and concurrent section calls in map-reduce mode
+SECTION_GROUP_SIZE = int(os.getenv("REPORT_SECTION_GROUP_SIZE", 3))
+REPORT_CONCURRENCY = int(os.getenv("REPORT_CONCURRENCY", 4))
+SECTION_CACHE_DIR = os.getenv("REPORT_SECTION_CACHE_DIR", "data/cache/report_sections")
 
-    prompt = """You are a professional company analyst assistant.
+REPORT_PROMPT = """You are a professional company analyst assistant.
 
 Your task is to write a comprehensive, factual, and well-organized report on the company using only the provided question-answer pairs. These pairs are based on credible sources.
 
@@ -31,16 +34,135 @@ Instructions:
 
 ---"""
 
-    for idx, (question, answers) in enumerate(data.items(), 1):
-        content = ""
-        for entry in answers[:3]:  # use top 3 results
-            title = entry.get("title", "")
-            body = entry.get("content", "").strip()
-            url = entry.get("url", "")
-            if body:
-                content += f"Title: {title}\nContent: {body}\nSource: {url}\n\n"
+SECTION_PROMPT = """You are a professional company analyst assistant.
+
+Write the report section(s) that answer the research questions below, using only the provided search results.
+
+Instructions:
+- Use a clear, well-titled Markdown heading for each topic.
+- Keep concrete facts: names, figures, dates, products.
+- Do not add external information or make assumptions beyond the given data.
+- After each section, include source attribution in parentheses using the provided URLs.
+- Maintain a formal, analytical, and objective tone.
+
+---"""
+
+REDUCE_PROMPT = """You are a professional company analyst assistant.
+
+Below are draft sections of a company report, each written from a subset of the research. Combine them into one comprehensive, well-organized report.
+
+Instructions:
+- Start with a short Overview, then order the sections logically (e.g., Leadership, Financials, Products, etc.).
+- Merge overlapping sections and remove repetition, keeping every distinct fact.
+- Keep the source attributions in parentheses exactly as given.
+- Do not add external information.
+- Maintain a formal, analytical, and objective tone.
+
+---"""
+
+def load_json(filepath: str):
+    return read_scrape(filepath)
+
+def format_question_block(idx: int, question: str, answers: list, top_k: int = 3, see_also: list = None) -> str:
+    content = ""
+    for entry in answers[:top_k]:  # use top 3 results
+        title = entry.get("title", "")
+        body = entry.get("content", "").strip()
+        url = entry.get("url", "")
+        if body:
+            content += f"Title: {title}\nContent: {body}\nSource: {url}\n\n"
+
+    if see_also:
+        # Results shared with earlier questions are listed only once, under those questions
+        content += f"See also the sources under {', '.join(f'Q{n}' for n in see_also)}.\n"
+
+    return f"\nQ{idx}. {question}\n{content}\n---\n"
+
+def question_blocks(data: dict, top_k: int = 3, dedupe: bool = DEDUP_ENABLED, start: int = 1) -> list:
+    """Format every question of `data`, numbering from `start`; duplicates point back to the first question that has them."""
+    if not dedupe:
+        return [format_question_block(idx, q, answers, top_k) for idx, (q, answers) in enumerate(data.items(), start)]
+
+    kept, provenance, stats = dedupe_scrape(data, top_k)
+    numbers = {question: idx for idx, question in enumerate(data, start)}
+    if stats["duplicates_dropped"]:
+        print(f"[INFO] Dedup: dropped {stats['duplicates_dropped']} duplicate results (~{stats['tokens_saved']} prompt tokens saved)")
+    return [
+        format_question_block(numbers[q], q, kept[q], top_k, [numbers[owner] for owner in provenance[q]])
+        for q in data
+    ]
+
+def create_report_from_json(filepath: str) -> str:
+    data = load_json(filepath)
+
+    prompt = REPORT_PROMPT
+    for block in question_blocks(data):
+        prompt += block
+
+    print(f"[INFO] Report prompt: ~{estimate_tokens(prompt)} tokens")
+    with span("llm", "report"):
+        response = model.generate_content(prompt)
+    record_prompt_tokens("report", prompt, response)
+    return response.text.strip()
+
+def _section_cache_path(prompt: str) -> str:
+    key = hashlib.sha256(f"{model.model_name}\x1f{prompt}".encode("utf-8")).hexdigest()
+    return os.path.join(SECTION_CACHE_DIR, f"{key}.md")
+
+def summarize_section(prompt: str) -> str:
+    """Generate one report section, reusing the cached text if this exact prompt was seen before."""
+    cache_path = _section_cache_path(prompt)
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    with span("llm", "report_section"):
+        response = model.generate_content(prompt)
+    record_prompt_tokens("report_section", prompt, response)
+    section = response.text.strip()
+    os.makedirs(SECTION_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(section)
+    os.replace(tmp_path, cache_path)
+    return section
+
+def create_report_map_reduce(filepath: str, group_size: int = None, max_workers: int = None, progress_callback=None) -> str:
+    """Summarize question groups in parallel (map), then stitch the sections together (reduce).
+
+    Each prompt stays bounded by the group size rather than the whole scrape, and
+    unchanged groups come straight from the section cache on re-runs.
+    """
+    data = load_json(filepath)
+    group_size = group_size or SECTION_GROUP_SIZE
+    max_workers = max_workers or REPORT_CONCURRENCY
+
+    # Dedup within each group: a section only sees its own questions, so a "see also"
+    # pointing into another group would lose that evidence, and an earlier group's
+    # results changing would invalidate every later section in the cache
+    items = list(data.items())
+    section_prompts = [
+        SECTION_PROMPT + "".join(question_blocks(dict(items[i:i + group_size]), start=i + 1))
+        for i in range(0, len(items), group_size)
+    ]
+    if not section_prompts:
+        raise ValueError(f"No questions found in {filepath}")
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(section_prompts))))
+    try:
+        futures = [pool.submit(summarize_section, p) for p in section_prompts]
+        if progress_callback:
+            for done, _ in enumerate(as_completed(futures), 1):
+                progress_callback(done, len(futures))
+        sections = [future.result() for future in futures]
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
 
-        prompt += f"\nQ{idx}. {question}\n{content}\n---\n"
+    reduce_prompt = REDUCE_PROMPT + "".join(f"\nSection {i}:\n{section}\n---\n" for i, section in enumerate(sections, 1))
+    peak_tokens = max(estimate_tokens(p) for p in section_prompts + [reduce_prompt])
+    print(f"[INFO] Map-reduce report: {len(section_prompts)} sections, peak prompt ~{peak_tokens} tokens")
 
-    response = model.generate_content(prompt)
-    return response.text.strip()
\ No newline at end of file
+    with span("llm", "report_reduce"):
+        response = model.generate_content(reduce_prompt)
+    record_prompt_tokens("report_reduce", reduce_prompt, response)
+    return response.text.strip()
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from functools import wraps
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "1") != "0"
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "data/cache/search_cache.sqlite3")
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 24 * 3600))
+SEARCH_CACHE_MAX_MB = float(os.getenv("SEARCH_CACHE_MAX_MB", 200))
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+class SearchCache:
+    """SQLite-backed cache of search results with TTL and size-bounded LRU eviction."""
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl=SEARCH_CACHE_TTL, max_bytes=int(SEARCH_CACHE_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS search_cache (
+                    provider TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    max_results INTEGER NOT NULL,
+                    results TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (provider, query, max_results)
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache (accessed_at)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, provider: str, query: str, max_results: int):
+        key = (provider, normalize_query(query), max_results)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT results, created_at FROM search_cache WHERE provider = ? AND query = ? AND max_results = ?",
+                key,
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    db.execute("DELETE FROM search_cache WHERE provider = ? AND query = ? AND max_results = ?", key)
+                    db.commit()
+                self.misses[provider] = self.misses.get(provider, 0) + 1
+                return None
+            db.execute(
+                "UPDATE search_cache SET accessed_at = ? WHERE provider = ? AND query = ? AND max_results = ?",
+                (now,) + key,
+            )
+            db.commit()
+            self.hits[provider] = self.hits.get(provider, 0) + 1
+        return json.loads(row[0])
+
+    def set(self, provider: str, query: str, max_results: int, results: list):
+        payload = json.dumps(results, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (provider, normalize_query(query), max_results, payload, len(payload), now, now),
+            )
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM search_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = db.execute("SELECT rowid, size FROM search_cache ORDER BY accessed_at ASC").fetchall()
+        stale = []
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((rowid,))
+            total -= size
+        db.executemany("DELETE FROM search_cache WHERE rowid = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM search_cache")
+            db.commit()
+            self.hits.clear()
+            self.misses.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM search_cache").fetchone()
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                "entries": entries,
+                "size_bytes": size,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "by_provider": {
+                    p: {"hits": self.hits.get(p, 0), "misses": self.misses.get(p, 0)}
+                    for p in sorted(set(self.hits) | set(self.misses))
+                },
+            }
+
+search_cache = SearchCache()
+_last_call = threading.local()
+
+def served_from_cache() -> bool:
+    """Whether the last cached_search call on this thread was answered by the cache."""
+    return getattr(_last_call, "hit", False)
+
+def cached_search(provider: str):
+    """Cache a `(query, max_results) -> list` search function; empty results are not stored."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(query, max_results=5, **kwargs):
+            _last_call.hit = False
+            if not SEARCH_CACHE_ENABLED:
+                return func(query, max_results, **kwargs)
+            cached = search_cache.get(provider, query, max_results)
+            _last_call.hit = cached is not None
+            if cached is not None:
+                return cached
+            results = func(query, max_results, **kwargs)
+            if results:
+                search_cache.set(provider, query, max_results, results)
+            return results
+        return wrapper
+    return decorator
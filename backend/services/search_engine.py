@@ -1,6 +1,14 @@
 import os
-import requests
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
 from dotenv import load_dotenv
+from backend.services.http_client import http_get, http_post
+from backend.services.search_cache import cached_search, served_from_cache
+from backend.services.metrics import span
+from backend.services.provider_health import provider_health
+from backend.services.rate_limiter import RateLimited, rate_limited, rate_limiter
 
 load_dotenv()
 
@@ -10,30 +18,207 @@ BRAVE_API_KEY = os.getenv("BRAVE_API_KEY")
 NEWSAPI_KEY = os.getenv("NEWSAPI_KEY")
 RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
 
-def search_web(query: str, max_results: int = 5) -> list:
-    sources = [
-        search_tavily,
-        search_serpapi,
-        search_brave,
-        search_newsapi,
-        search_rapidapi,
-        search_wikipedia,
+# Provider endpoints; overridable so benchmarks can point at local stand-ins
+TAVILY_URL = os.getenv("TAVILY_URL", "https://api.tavily.com/search")
+SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search")
+BRAVE_URL = os.getenv("BRAVE_URL", "https://api.search.brave.com/res/v1/web/search")
+NEWSAPI_URL = os.getenv("NEWSAPI_URL", "https://newsapi.org/v2/everything")
+RAPIDAPI_URL = os.getenv("RAPIDAPI_URL", "https://bing-web-search1.p.rapidapi.com/search")
+WIKIPEDIA_URL = os.getenv("WIKIPEDIA_URL", "https://en.wikipedia.org/w/api.php")
+
+# Max in-flight calls per provider, shared by every caller in the process
+# (bulk searches, concurrent API requests). Override with e.g. TAVILY_MAX_CONCURRENCY=2.
+# The primary provider's cap is at least BULK_SEARCH_CONCURRENCY so one bulk run is
+# not split into batches.
+PROVIDER_CONCURRENCY = {
+    name: int(os.getenv(f"{name.upper()}_MAX_CONCURRENCY", default))
+    for name, default in [
+        ("tavily", 16),
+        ("serpapi", 4),
+        ("brave", 2),
+        ("newsapi", 2),
+        ("rapidapi", 2),
+        ("wikipedia", 8),
+    ]
+}
+_provider_slots = {name: threading.BoundedSemaphore(limit) for name, limit in PROVIDER_CONCURRENCY.items()}
+
+# Per-provider request timeout in seconds, e.g. TAVILY_TIMEOUT=8
+PROVIDER_TIMEOUTS = {
+    name: float(os.getenv(f"{name.upper()}_TIMEOUT", default))
+    for name, default in [
+        ("tavily", 15),
+        ("serpapi", 10),
+        ("brave", 8),
+        ("newsapi", 8),
+        ("rapidapi", 8),
+        ("wikipedia", 5),
     ]
+}
+
+# "sequential" (try providers in order), "hedged" (start the next provider once the
+# current one exceeds its p95 latency) or "race" (call all, return the first non-empty)
+SEARCH_STRATEGIES = ("sequential", "hedged", "race")
+SEARCH_STRATEGY = os.getenv("SEARCH_STRATEGY", "sequential")
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", 2.0))
+HEDGE_MIN_SAMPLES = 5
+
+# Providers that cannot work without a key are skipped when it is not set
+PROVIDER_KEYS = {
+    "tavily": TAVILY_API_KEY,
+    "serpapi": SERPAPI_KEY,
+    "brave": BRAVE_API_KEY,
+    "newsapi": NEWSAPI_KEY,
+    "rapidapi": RAPIDAPI_KEY,
+}
+
+def provider_configured(name: str) -> bool:
+    return bool(PROVIDER_KEYS.get(name, True))
+
+for _name in PROVIDER_CONCURRENCY:
+    provider_health.register(_name, provider_configured(_name))
+
+_latency_samples = {name: deque(maxlen=200) for name in PROVIDER_CONCURRENCY}
+_provider_pool = ThreadPoolExecutor(max_workers=int(os.getenv("SEARCH_POOL_SIZE", 32)), thread_name_prefix="search")
+
+def provider_name(source) -> str:
+    return source.__name__.replace("search_", "", 1)
+
+def call_provider(source, query: str, max_results: int) -> list:
+    name = provider_name(source)
+    with _provider_slots[name]:
+        start = time.perf_counter()
+        try:
+            with span("provider_call", name):
+                results = source(query, max_results)
+        except RateLimited:
+            # Skipped on purpose, not a sign of an unhealthy provider
+            raise
+        except Exception as e:
+            provider_health.record(name, time.perf_counter() - start, e)
+            raise
+        if served_from_cache():
+            # A cache hit says nothing about the provider's latency or usefulness
+            return results
+        elapsed = time.perf_counter() - start
+        _latency_samples[name].append(elapsed)
+        provider_health.record(name, elapsed, empty=not results)
+        return results
+
+def hedge_delay(source) -> float:
+    samples = sorted(_latency_samples[provider_name(source)])
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
 
+def _provider_result(future, source) -> list:
+    try:
+        results = future.result()
+    except RateLimited as e:
+        print(f"[INFO] {source.__name__} skipped: {e}")
+        return []
+    except Exception as e:
+        print(f"[WARN] {source.__name__} failed: {e}")
+        return []
+    if results:
+        print(f"[INFO] {source.__name__} succeeded.")
+    return results
+
+def _cancel_losers(futures):
+    # Calls that have not started are dropped; running ones are abandoned and
+    # bounded by their provider timeout.
+    for future in futures:
+        future.cancel()
+
+def _search_sequential(sources, query, max_results):
     for source in sources:
         try:
-            results = source(query, max_results)
+            results = call_provider(source, query, max_results)
             if results:
                 print(f"[INFO] {source.__name__} succeeded.")
                 return results
+        except RateLimited as e:
+            print(f"[INFO] {source.__name__} skipped: {e}")
         except Exception as e:
             print(f"[WARN] {source.__name__} failed: {e}")
+    return []
+
+def _search_hedged(sources, query, max_results):
+    launched = {}
+    pending = set()
+    next_idx = 0
+
+    def launch():
+        nonlocal next_idx
+        source = sources[next_idx]
+        next_idx += 1
+        future = _provider_pool.submit(call_provider, source, query, max_results)
+        launched[future] = source
+        pending.add(future)
+        return source
 
-    print("[ERROR] All search engines failed.")
+    latest = launch()
+    while pending:
+        timeout = hedge_delay(latest) if next_idx < len(sources) else None
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        pending.difference_update(done)
+        for future in done:
+            results = _provider_result(future, launched[future])
+            if results:
+                _cancel_losers(pending)
+                return results
+        # Either the hedge delay elapsed or a provider came back empty: start the next one
+        if next_idx < len(sources):
+            latest = launch()
     return []
 
+def _search_race(sources, query, max_results):
+    launched = {_provider_pool.submit(call_provider, source, query, max_results): source for source in sources}
+    pending = set(launched)
+    for future in as_completed(launched):
+        pending.discard(future)
+        results = _provider_result(future, launched[future])
+        if results:
+            _cancel_losers(pending)
+            return results
+    return []
+
+@cached_search("web")
+def search_web(query: str, max_results: int = 5, strategy: str = None) -> list:
+    sources = [
+        search_tavily,
+        search_serpapi,
+        search_brave,
+        search_newsapi,
+        search_rapidapi,
+        search_wikipedia,
+    ]
+    # Drop providers without a key, with an open circuit or out of daily quota; best observed first
+    by_name = {provider_name(source): source for source in sources}
+    usable = [name for name in by_name if rate_limiter.has_quota(name)]
+    sources = [by_name[name] for name in provider_health.order(usable)]
+    if not sources:
+        print("[ERROR] No search provider has an API key and quota left.")
+        return []
+
+    strategy = strategy or SEARCH_STRATEGY
+    if strategy == "hedged":
+        results = _search_hedged(sources, query, max_results)
+    elif strategy == "race":
+        results = _search_race(sources, query, max_results)
+    elif strategy == "sequential":
+        results = _search_sequential(sources, query, max_results)
+    else:
+        raise ValueError(f"Unknown search strategy '{strategy}', expected one of {SEARCH_STRATEGIES}")
+
+    if not results:
+        print("[ERROR] All search engines failed.")
+    return results
+
+@cached_search("tavily")
+@rate_limited("tavily")
 def search_tavily(query, max_results):
-    url = "https://api.tavily.com/search"
+    url = TAVILY_URL
     payload = {
         "api_key": TAVILY_API_KEY,
         "query": query,
@@ -42,22 +227,24 @@ def search_tavily(query, max_results):
         "include_answer": False,
         "include_images": False
     }
-    response = requests.post(url, json=payload)
+    response = http_post(url, json=payload, timeout=PROVIDER_TIMEOUTS["tavily"])
     response.raise_for_status()
     return [
         {"url": r["url"], "title": r["title"], "content": r.get("content", "")}
         for r in response.json().get("results", [])
     ]
 
+@cached_search("serpapi")
+@rate_limited("serpapi")
 def search_serpapi(query, max_results):
-    url = "https://serpapi.com/search"
+    url = SERPAPI_URL
     params = {
         "q": query,
         "api_key": SERPAPI_KEY,
         "num": max_results,
         "engine": "google"
     }
-    response = requests.get(url, params=params)
+    response = http_get(url, params=params, timeout=PROVIDER_TIMEOUTS["serpapi"])
     response.raise_for_status()
     data = response.json()
     return [
@@ -69,14 +256,16 @@ def search_serpapi(query, max_results):
         for res in data.get("organic_results", [])[:max_results]
     ]
 
+@cached_search("brave")
+@rate_limited("brave")
 def search_brave(query, max_results):
-    url = "https://api.search.brave.com/res/v1/web/search"
+    url = BRAVE_URL
     headers = {
         "Accept": "application/json",
         "X-Subscription-Token": BRAVE_API_KEY
     }
     params = {"q": query, "count": max_results}
-    response = requests.get(url, headers=headers, params=params)
+    response = http_get(url, headers=headers, params=params, timeout=PROVIDER_TIMEOUTS["brave"])
     response.raise_for_status()
     return [
         {
@@ -87,14 +276,16 @@ def search_brave(query, max_results):
         for item in response.json().get("web", {}).get("results", [])
     ]
 
+@cached_search("newsapi")
+@rate_limited("newsapi")
 def search_newsapi(query, max_results):
-    url = "https://newsapi.org/v2/everything"
+    url = NEWSAPI_URL
     params = {
         "q": query,
         "pageSize": max_results,
         "apiKey": NEWSAPI_KEY
     }
-    response = requests.get(url, params=params)
+    response = http_get(url, params=params, timeout=PROVIDER_TIMEOUTS["newsapi"])
     response.raise_for_status()
     return [
         {
@@ -105,14 +296,16 @@ def search_newsapi(query, max_results):
         for a in response.json().get("articles", [])
     ]
 
+@cached_search("rapidapi")
+@rate_limited("rapidapi")
 def search_rapidapi(query, max_results):
-    url = "https://bing-web-search1.p.rapidapi.com/search"
+    url = RAPIDAPI_URL
     headers = {
         "X-RapidAPI-Key": RAPIDAPI_KEY,
         "X-RapidAPI-Host": "bing-web-search1.p.rapidapi.com"
     }
     params = {"q": query, "count": max_results}
-    response = requests.get(url, headers=headers, params=params)
+    response = http_get(url, headers=headers, params=params, timeout=PROVIDER_TIMEOUTS["rapidapi"])
     response.raise_for_status()
     data = response.json()
     return [
@@ -124,15 +317,17 @@ def search_rapidapi(query, max_results):
         for item in data.get("webPages", {}).get("value", [])
     ]
 
+@cached_search("wikipedia")
+@rate_limited("wikipedia")
 def search_wikipedia(query, max_results):
-    url = "https://en.wikipedia.org/w/api.php"
+    url = WIKIPEDIA_URL
     params = {
         "action": "query",
         "list": "search",
         "srsearch": query,
         "format": "json"
     }
-    response = requests.get(url, params=params)
+    response = http_get(url, params=params, timeout=PROVIDER_TIMEOUTS["wikipedia"])
     response.raise_for_status()
     results = response.json().get("query", {}).get("search", [])
     return [
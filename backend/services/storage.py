@@ -0,0 +1,147 @@
+"""Compact storage for scraped search results.
+
+Scrapes are written as JSON Lines, zstd-compressed when `zstandard` is installed:
+
+    {"format": "scrape-jsonl", "version": 1}
+    {"question": "...", "results": [{"id": 0, "url": ..., "title": ..., "content": ...}, ...]}
+    {"question": "...", "results": [{"ref": 0}, {"id": 1, ...}]}
+
+A result that already appeared under an earlier question is stored once and then
+referenced by id, so overlapping URLs across questions cost a few bytes. Each line
+is one question, so readers can stream question by question. Legacy pretty-printed
+`.json` files are still read transparently.
+
+Migrate old files with:
+    python -m backend.services.storage migrate data/scraped_content/*.json
+"""
+import os
+import sys
+import json
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+load_dotenv()
+
+FORMAT_NAME = "scrape-jsonl"
+FORMAT_VERSION = 1
+SCRAPE_FORMATS = ("jsonl.zst", "jsonl", "json")
+SCRAPE_FORMAT = os.getenv("SCRAPE_FORMAT", "jsonl.zst" if zstandard else "jsonl")
+
+def _dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def _loads(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def _open_text(filepath: str, mode: str, compressed: bool = None):
+    if compressed is None:
+        compressed = filepath.endswith(".zst")
+    if compressed:
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read or write {filepath}")
+        return zstandard.open(filepath, mode + "t", encoding="utf-8")
+    return open(filepath, mode, encoding="utf-8")
+
+def scrape_extension(fmt: str = None) -> str:
+    fmt = fmt or SCRAPE_FORMAT
+    if fmt not in SCRAPE_FORMATS:
+        raise ValueError(f"Unknown scrape format '{fmt}', expected one of {SCRAPE_FORMATS}")
+    if fmt == "jsonl.zst" and zstandard is None:
+        fmt = "jsonl"
+    return f".{fmt}"
+
+def _result_key(item: dict) -> str:
+    return _dumps(sorted(item.items()))
+
+def write_scrape(filepath: str, results: dict) -> dict:
+    """Write {question: [result, ...]} to `filepath`; the extension picks the format.
+
+    Returns counts of results written and results deduplicated by reference.
+    """
+    if filepath.endswith(".json"):
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        return {"results": sum(len(items) for items in results.values()), "deduplicated": 0}
+
+    seen = {}
+    written = deduplicated = 0
+    tmp_path = f"{filepath}.tmp"
+    with _open_text(tmp_path, "w", compressed=filepath.endswith(".zst")) as f:
+        f.write(_dumps({"format": FORMAT_NAME, "version": FORMAT_VERSION}) + "\n")
+        for question, items in results.items():
+            stored = []
+            for item in items:
+                key = _result_key(item)
+                if key in seen:
+                    stored.append({"ref": seen[key]})
+                    deduplicated += 1
+                else:
+                    seen[key] = len(seen)
+                    stored.append({"id": seen[key], **item})
+                    written += 1
+            f.write(_dumps({"question": question, "results": stored}) + "\n")
+    os.replace(tmp_path, filepath)
+    return {"results": written, "deduplicated": deduplicated}
+
+def iter_scrape(filepath: str):
+    """Yield (question, results) pairs in saved order, one question at a time."""
+    if filepath.endswith(".json"):
+        with open(filepath, "r", encoding="utf-8") as f:
+            yield from json.load(f).items()
+        return
+
+    by_id = {}
+    with _open_text(filepath, "r") as f:
+        header = _loads(f.readline())
+        if header.get("format") != FORMAT_NAME:
+            raise ValueError(f"{filepath} is not a {FORMAT_NAME} file")
+        for line in f:
+            if not line.strip():
+                continue
+            record = _loads(line)
+            results = []
+            for item in record["results"]:
+                if "ref" in item:
+                    results.append(by_id[item["ref"]])
+                else:
+                    item = dict(item)
+                    by_id[item.pop("id")] = item
+                    results.append(item)
+            yield record["question"], results
+
+def read_scrape(filepath: str) -> dict:
+    return dict(iter_scrape(filepath))
+
+def migrate_scrape(filepath: str, fmt: str = None) -> str:
+    """Rewrite a legacy `.json` scrape in the compact format next to the original."""
+    base = filepath[:-len(".json")] if filepath.endswith(".json") else filepath
+    new_path = base + scrape_extension(fmt)
+    stats = write_scrape(new_path, read_scrape(filepath))
+    old_size, new_size = os.path.getsize(filepath), os.path.getsize(new_path)
+    print(f"{filepath} -> {new_path}: {old_size} -> {new_size} bytes, {stats['deduplicated']} duplicate results")
+    return new_path
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[0] != "migrate":
+        print("usage: python -m backend.services.storage migrate FILE [FILE ...]")
+        return 2
+    for filepath in argv[1:]:
+        migrate_scrape(filepath)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
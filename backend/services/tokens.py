@@ -0,0 +1,6 @@
+# Gemini and MiniLM tokenizers average roughly four characters per token on English prose
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for budgeting and telemetry; avoids a count_tokens API call."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
@@ -1,3 +1,5 @@
+import json
+import time
 import streamlit as st
 import requests
 
@@ -71,14 +73,33 @@ with tab3:
         with st.spinner("Running search engines..."):
             try:
                 res = requests.post(
-                    "http://localhost:8000/search-all/",
+                    "http://localhost:8000/jobs/search-all",
                     json={"company": company, "questions": st.session_state.queries},
-                    timeout=600
+                    timeout=20
                 )
                 if res.status_code == 200 and res.json()["status"] == "success":
-                    st.session_state.filepath = res.json()["filepath"]
-                    st.success("Research complete!")
-                    st.code(f"Data saved at: {res.json()['filepath']}")
+                    job_id = res.json()["job_id"]
+                    progress_bar = st.progress(0.0, text="Queued...")
+                    # Poll the background job instead of holding one request open for minutes
+                    while True:
+                        job = requests.get(f"http://localhost:8000/jobs/{job_id}", timeout=20).json()
+                        searched = job["progress"].get("questions searched")
+                        if searched and searched["total"]:
+                            progress_bar.progress(
+                                searched["done"] / searched["total"],
+                                text=f"Searched {searched['done']} of {searched['total']} questions"
+                            )
+                        if job["status"] not in ("queued", "running"):
+                            break
+                        time.sleep(1)
+
+                    result = requests.get(f"http://localhost:8000/jobs/{job_id}/result", timeout=20).json()
+                    if result["status"] == "success":
+                        st.session_state.filepath = result["filepath"]
+                        st.success("Research complete!")
+                        st.code(f"Data saved at: {result['filepath']}")
+                    else:
+                        st.error(f"{result.get('error') or result['status']}")
                 else:
                     st.error(f"{res.json().get('error')}")
             except Exception as e:
@@ -134,16 +155,27 @@ with tab6:
     user_q = st.text_input("Ask something about the company:", key="rag_input")
 
     if user_q and st.button("🔍 Ask Gemini with Context"):
-        with st.spinner("Retrieving relevant context and generating answer..."):
+        with st.spinner("Retrieving relevant context..."):
             try:
-                res = requests.post("http://localhost:8000/ask/", json={
+                res = requests.post("http://localhost:8000/ask-stream/", json={
                     "company": company,
                     "question": user_q
-                })
-                if res.status_code == 200 and res.json()["status"] == "success":
-                    st.success("Gemini's Answer:")
-                    st.markdown(res.json()["answer"])
-                else:
-                    st.error(f"{res.json().get('error')}")
+                }, stream=True, timeout=120)
+                st.success("Gemini's Answer:")
+                placeholder = st.empty()
+                answer, event = "", None
+                for line in res.iter_lines(decode_unicode=True):
+                    if line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:"):
+                        data = json.loads(line[len("data:"):])
+                        if event == "error":
+                            st.error(data.get("error"))
+                        elif event is None:
+                            answer += data["text"]
+                            placeholder.markdown(answer + "▌")
+                    elif not line:
+                        event = None
+                placeholder.markdown(answer)
             except Exception as e:
-                st.error(f"Exception: {e}")
\ No newline at end of file
+                st.error(f"Exception: {e}")